@@ -119,6 +119,43 @@ def load_data():
         st.error(f"Error loading data: {e}. Ensure run_churn_radar.py has been executed successfully.")
         st.stop()
 
+# Static help content, rendered once into a single markdown blob per expander
+@st.cache_data
+def cohort_library_markdown():
+    sections = []
+    for cohort_name, info in COHORT_LIBRARY.items():
+        lines = [f"**{cohort_name}**", f"*Who:* {info['who']}"]
+        if 'why_matters' in info:
+            lines.append(f"*Why it matters:* {info['why_matters']}")
+        lines.append(f"*Say:* {info['say']}")
+        sections.append("\n\n".join(lines))
+    return "\n\n---\n\n".join(sections) + "\n\n---"
+
+@st.cache_data
+def copy_rules_markdown():
+    return "\n".join([
+        f"**Tone:** {COPY_RULES['tone']}",
+        "",
+        "**Email:**",
+        f"- Subject: {COPY_RULES['email']['subject']}",
+        f"- Body: {COPY_RULES['email']['body']}",
+        f"- {COPY_RULES['email']['cta']}",
+        "",
+        "**WhatsApp:**",
+        f"- Length: {COPY_RULES['whatsapp']['length']}",
+        f"- Policy: {COPY_RULES['whatsapp']['policy']}",
+        "",
+        "**Push:**",
+        f"- Length: {COPY_RULES['push']['length']}",
+        f"- Structure: {COPY_RULES['push']['structure']}",
+        "",
+        f"**Banned phrases:** {', '.join(COPY_RULES['banned_phrases'])}",
+        "",
+        f"**Safe tokens:** {', '.join(COPY_RULES['safe_tokens'])}",
+        "",
+        f"**Eval badge:** {COPY_RULES['eval_badge']}",
+    ])
+
 # Load data
 groups, defaults = load_data()
 
@@ -307,13 +344,7 @@ with col_header:
     st.markdown("*Groups ranked by profit potential with one-line reasons*")
 with col_help:
     with st.expander("ⓘ What are these groups?"):
-        for cohort_name, info in COHORT_LIBRARY.items():
-            st.markdown(f"**{cohort_name}**")
-            st.markdown(f"*Who:* {info['who']}")
-            if 'why_matters' in info:
-                st.markdown(f"*Why it matters:* {info['why_matters']}")
-            st.markdown(f"*Say:* {info['say']}")
-            st.markdown("---")
+        st.markdown(cohort_library_markdown())
 
 # Build ladder data with reasons
 ladder_rows = []
@@ -491,20 +522,7 @@ if ladder_rows:
             st.subheader("Ready-to-Send Messages")
         with col_msg_help:
             with st.expander("ⓘ How we write"):
-                st.markdown(f"**Tone:** {COPY_RULES['tone']}")
-                st.markdown("**Email:**")
-                st.markdown(f"- Subject: {COPY_RULES['email']['subject']}")
-                st.markdown(f"- Body: {COPY_RULES['email']['body']}")
-                st.markdown(f"- {COPY_RULES['email']['cta']}")
-                st.markdown("**WhatsApp:**")
-                st.markdown(f"- Length: {COPY_RULES['whatsapp']['length']}")
-                st.markdown(f"- Policy: {COPY_RULES['whatsapp']['policy']}")
-                st.markdown("**Push:**")
-                st.markdown(f"- Length: {COPY_RULES['push']['length']}")
-                st.markdown(f"- Structure: {COPY_RULES['push']['structure']}")
-                st.markdown(f"**Banned phrases:** {', '.join(COPY_RULES['banned_phrases'])}")
-                st.markdown(f"**Safe tokens:** {', '.join(COPY_RULES['safe_tokens'])}")
-                st.markdown(f"**Eval badge:** {COPY_RULES['eval_badge']}")
+                st.markdown(copy_rules_markdown())
         
         msgs = kept_messages(top_group)
         msg_cols = st.columns(3)
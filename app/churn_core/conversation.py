@@ -4,7 +4,9 @@ Implements the function contracts from TRD Section 4
 """
 
 import json
+import copy
 import pandas as pd
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 import os
@@ -13,19 +15,19 @@ from .logic import get_groups, kept_messages, get_defaults, calculate_roi
 from .data import format_inr, format_score_as_odds, format_days, format_months
 from .content import METRIC_DEFINITIONS, ARCHETYPE_REASONS, COPY_RULES
 
+MANIFEST_PATH = Path(__file__).resolve().parents[2] / "exports" / "manifest.json"
 
-def get_headline_kpis() -> Dict[str, Any]:
-    """
-    Get headline KPIs for the dashboard.
-    
-    Returns:
-        {
-            "recoverable_profit_30d": int,
-            "ready_groups_today": int, 
-            "expected_reactivations": int,
-            "assumptions": {"rr": float, "aov": float, "margin": float}
-        }
-    """
+
+def _exports_version() -> Optional[float]:
+    """mtime of exports/manifest.json; a new runner export invalidates the cached tool results"""
+    try:
+        return MANIFEST_PATH.stat().st_mtime
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=1)
+def _headline_kpis(version: Optional[float]) -> Dict[str, Any]:
     try:
         # Load the existing groups data
         groups = get_groups()
@@ -65,17 +67,23 @@ def get_headline_kpis() -> Dict[str, Any]:
         }
 
 
-def list_cohorts(limit: int = 5) -> List[Dict[str, Any]]:
+def get_headline_kpis() -> Dict[str, Any]:
     """
-    List top cohorts sorted by net profit.
+    Get headline KPIs for the dashboard.
     
-    Args:
-        limit: Maximum number of cohorts to return
-        
     Returns:
-        List of cohort dictionaries with fields:
-        - name, people, last_seen_days, comeback_odds, net_profit, archetype, why
+        {
+            "recoverable_profit_30d": int,
+            "ready_groups_today": int, 
+            "expected_reactivations": int,
+            "assumptions": {"rr": float, "aov": float, "margin": float}
+        }
     """
+    return copy.deepcopy(_headline_kpis(_exports_version()))
+
+
+@lru_cache(maxsize=8)
+def _list_cohorts(limit: int, version: Optional[float]) -> List[Dict[str, Any]]:
     try:
         groups = get_groups()
         
@@ -121,16 +129,22 @@ def list_cohorts(limit: int = 5) -> List[Dict[str, Any]]:
         ]}
 
 
-def get_cohort_passport(name: str) -> Dict[str, Any]:
+def list_cohorts(limit: int = 5) -> List[Dict[str, Any]]:
     """
-    Get detailed passport for a specific cohort.
+    List top cohorts sorted by net profit.
     
     Args:
-        name: Cohort name (e.g., "Premium engagement lapsed")
+        limit: Maximum number of cohorts to return
         
     Returns:
-        Passport dictionary with 6 core metrics + archetype + tokens
+        List of cohort dictionaries with fields:
+        - name, people, last_seen_days, comeback_odds, net_profit, archetype, why
     """
+    return copy.deepcopy(_list_cohorts(limit, _exports_version()))
+
+
+@lru_cache(maxsize=32)
+def _cohort_passport(name: str, version: Optional[float]) -> Dict[str, Any]:
     try:
         groups = get_groups()
         
@@ -192,6 +206,19 @@ def get_cohort_passport(name: str) -> Dict[str, Any]:
         }
 
 
+def get_cohort_passport(name: str) -> Dict[str, Any]:
+    """
+    Get detailed passport for a specific cohort.
+    
+    Args:
+        name: Cohort name (e.g., "Premium engagement lapsed")
+        
+    Returns:
+        Passport dictionary with 6 core metrics + archetype + tokens
+    """
+    return copy.deepcopy(_cohort_passport(name, _exports_version()))
+
+
 def show_roi(name: str = None) -> Dict[str, Any]:
     """
     Calculate ROI projection for a cohort or overall waterfall.
@@ -9,6 +9,14 @@ import pandas as pd
 import json
 from pathlib import Path
 
+# PyArrow CSV writer (releases the GIL) with pandas fallback
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 # Add parent directory to path so we can import run_churn_radar
 parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.insert(0, parent_dir)
@@ -348,9 +356,12 @@ def calculate_roi(group_name: str, params: Optional[Dict[str, float]] = None) ->
         }
     }
 
-def export_group_csv(group_name: str) -> str:
+CSV_COMPRESSION_SUFFIXES = {"gzip": ".gz", "zip": ".zip"}
+
+def export_group_csv(group_name: str, compression: Optional[str] = None, compresslevel: int = 1) -> str:
     """
     Export group data to CSV and return the file path.
+    Pass compression="gzip" (or "zip") to write a compressed .csv.gz/.csv.zip.
     """
     groups = get_groups()
     if group_name not in groups:
@@ -362,6 +373,8 @@ def export_group_csv(group_name: str) -> str:
     
     # Use existing CSV if available, otherwise create minimal one
     group_file = group_name.replace(" ", "_").replace("-", "_") + ".csv"
+    if compression:
+        group_file += CSV_COMPRESSION_SUFFIXES.get(compression, f".{compression}")
     file_path = exports_dir / group_file
     
     if not file_path.exists():
@@ -376,7 +389,16 @@ def export_group_csv(group_name: str) -> str:
             "avg_recency": summary["avg_recency"],
             "avg_value": summary["avg_value"]
         }])
-        df.to_csv(file_path, index=False)
+        if compression:
+            df.to_csv(file_path, index=False, compression={"method": compression, "compresslevel": compresslevel})
+        elif PYARROW_AVAILABLE:
+            pacsv.write_csv(
+                pa.Table.from_pandas(df, preserve_index=False),
+                str(file_path),
+                write_options=pacsv.WriteOptions(include_header=True)
+            )
+        else:
+            df.to_csv(file_path, index=False)
     
     return str(file_path)
 
@@ -5,6 +5,7 @@ Implements the chat interface with OpenAI function calling
 
 import json
 import os
+import asyncio
 from typing import Dict, List, Any, Optional, Tuple
 from dotenv import load_dotenv
 import httpx
@@ -16,6 +17,26 @@ from .conversation import (
 
 load_dotenv()
 
+# System prompt for retention assistant
+SYSTEM_PROMPT = """You are a Retention Assistant for Churn Radar. You help marketers understand their customer retention data and generate re-engagement campaigns.
+
+Key principles:
+- Use tools to fetch real facts; never invent numbers
+- Speak plainly and explain business terms on first mention  
+- Format currency as ₹12,34,567 (Indian format)
+- When showing cohorts, include the one-line "why" reason
+- For copy requests, mention that messages have brand-safe evaluation badges
+- Keep responses focused and actionable
+
+Common user intents:
+- "What should I do today?" → get_headline_kpis + list_cohorts(3) 
+- "Open [cohort name]" → get_cohort_passport + show_roi
+- "What's [term]?" → list_definitions (find the term)
+- "Compare A vs B" → compare_cohorts
+- "Export [cohort]" → export_copy_pack
+
+Be conversational but data-driven. Always lead with the most important insight."""
+
 
 class ConversationOrchestrator:
     """
@@ -155,31 +176,49 @@ class ConversationOrchestrator:
         Returns:
             Tuple of (assistant_message, tool_data)
         """
+        async def _run():
+            async with httpx.AsyncClient(timeout=30) as client:
+                return await self.achat(user_message, client)
+        return asyncio.run(_run())
+    
+    def chat_batch(self, queries: List[str]) -> List[Tuple[str, Optional[Dict]]]:
+        """
+        Answer independent questions concurrently over one HTTP client.
+        
+        Each query gets its own fresh history, so answers do not see each other
+        and the orchestrator's own conversation history is left untouched.
+        
+        Args:
+            queries: User questions
+            
+        Returns:
+            List of (assistant_message, tool_data), in the order of queries
+        """
+        async def _run():
+            async with httpx.AsyncClient(timeout=30) as client:
+                return await asyncio.gather(*(self.achat(q, client, history=[]) for q in queries))
+        return list(asyncio.run(_run()))
+    
+    async def achat(self, user_message: str, client: httpx.AsyncClient,
+                    history: Optional[List[Dict]] = None) -> Tuple[str, Optional[Dict]]:
+        """
+        Async core of chat(); appends the exchange to history (default: the conversation history).
+        
+        Args:
+            user_message: User's question or request
+            client: Shared async HTTP client
+            history: Message list to read from and append to
+            
+        Returns:
+            Tuple of (assistant_message, tool_data)
+        """
+        if history is None:
+            history = self.conversation_history
         
         # Add user message to history
-        self.conversation_history.append({"role": "user", "content": user_message})
+        history.append({"role": "user", "content": user_message})
         
-        # System prompt for retention assistant
-        system_prompt = """You are a Retention Assistant for Churn Radar. You help marketers understand their customer retention data and generate re-engagement campaigns.
-
-Key principles:
-- Use tools to fetch real facts; never invent numbers
-- Speak plainly and explain business terms on first mention  
-- Format currency as ₹12,34,567 (Indian format)
-- When showing cohorts, include the one-line "why" reason
-- For copy requests, mention that messages have brand-safe evaluation badges
-- Keep responses focused and actionable
-
-Common user intents:
-- "What should I do today?" → get_headline_kpis + list_cohorts(3) 
-- "Open [cohort name]" → get_cohort_passport + show_roi
-- "What's [term]?" → list_definitions (find the term)
-- "Compare A vs B" → compare_cohorts
-- "Export [cohort]" → export_copy_pack
-
-Be conversational but data-driven. Always lead with the most important insight."""
-
-        messages = [{"role": "system", "content": system_prompt}] + self.conversation_history
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}] + history
         
         try:
             headers = {'Authorization': f'Bearer {self.api_key}', 'Content-Type': 'application/json'}
@@ -192,11 +231,10 @@ Be conversational but data-driven. Always lead with the most important insight."
                 'temperature': 0.3
             }
             
-            response = httpx.post(
+            response = await client.post(
                 'https://api.openai.com/v1/chat/completions',
                 json=payload,
-                headers=headers,
-                timeout=30
+                headers=headers
             )
             
             if response.status_code != 200:
@@ -221,21 +259,21 @@ Be conversational but data-driven. Always lead with the most important insight."
                     })
                     
                     # Add tool result to conversation
-                    self.conversation_history.append({
+                    history.append({
                         "role": "assistant",
                         "content": None,
                         "tool_calls": [tool_call]
                     })
-                    self.conversation_history.append({
+                    history.append({
                         "role": "tool",
                         "tool_call_id": tool_call['id'],
                         "content": json.dumps(function_result)
                     })
                 
                 # Get final response with tool results
-                messages = [{"role": "system", "content": system_prompt}] + self.conversation_history
+                messages = [{"role": "system", "content": SYSTEM_PROMPT}] + history
                 
-                final_response = httpx.post(
+                final_response = await client.post(
                     'https://api.openai.com/v1/chat/completions',
                     json={
                         'model': 'gpt-3.5-turbo',
@@ -243,8 +281,7 @@ Be conversational but data-driven. Always lead with the most important insight."
                         'max_tokens': 800,
                         'temperature': 0.3
                     },
-                    headers=headers,
-                    timeout=30
+                    headers=headers
                 )
                 
                 if final_response.status_code == 200:
@@ -252,7 +289,7 @@ Be conversational but data-driven. Always lead with the most important insight."
                     final_message = final_result['choices'][0]['message']['content']
                     
                     # Add to conversation history
-                    self.conversation_history.append({"role": "assistant", "content": final_message})
+                    history.append({"role": "assistant", "content": final_message})
                     
                     # Return response with tool data for UI enhancements
                     return final_message, tool_results[0]['result'] if tool_results else None
@@ -262,7 +299,7 @@ Be conversational but data-driven. Always lead with the most important insight."
             else:
                 # No tools needed, direct response
                 response_text = assistant_message['content']
-                self.conversation_history.append({"role": "assistant", "content": response_text})
+                history.append({"role": "assistant", "content": response_text})
                 return response_text, None
                 
         except Exception as e:
@@ -4,6 +4,7 @@ Exports Page - Data export and copy pack generation.
 import streamlit as st
 import pandas as pd
 import json
+import time
 from datetime import datetime
 from pathlib import Path
 from churn_core.logic import (
@@ -27,6 +28,62 @@ def load_export_data():
     return get_groups(), get_defaults()
 
 groups, defaults = load_export_data()
+GROUP_NAMES = tuple(groups.keys())
+
+if not groups:
+    st.warning("No groups loaded. Run 'python run_churn_radar.py' to generate cohort data first.")
+    st.stop()
+
+exports_dir = Path(__file__).parent.parent.parent / "exports"
+exports_dir.mkdir(parents=True, exist_ok=True)
+
+# Number of top-level copy pack keys rendered inline in previews
+PREVIEW_KEYS = 3
+
+def selected_compression():
+    """Map the Compression setting to a pandas compression method (None for plain CSV)."""
+    choice = st.session_state.get("export_compression", "None")
+    return choice.lower() if choice != "None" else None
+
+def generate_manifest_once():
+    """Write the manifest once per session unless groups or defaults change."""
+    manifest_key = hash((tuple(sorted(GROUP_NAMES)), json.dumps(defaults, sort_keys=True)))
+    if st.session_state.get("manifest_key") == manifest_key and st.session_state.get("manifest_path"):
+        return st.session_state.manifest_path
+    
+    file_path = export_manifest()
+    if file_path:
+        st.session_state.manifest_key = manifest_key
+        st.session_state.manifest_path = file_path
+    return file_path
+
+# Seconds a group's exported CSV is reused before it is written again
+CSV_EXPORT_TTL = 300
+
+def export_all_csvs(group_names, compression):
+    """Export CSVs for all groups; recent exports whose files still exist are reused, errors never are."""
+    exports = st.session_state.setdefault("csv_exports", {})
+    now = time.time()
+    exported_files = []
+    errors = []
+    
+    for group_name in group_names:
+        key = (group_name, compression)
+        cached = exports.get(key)
+        if cached and now - cached[1] < CSV_EXPORT_TTL and Path(cached[0]).exists():
+            exported_files.append(cached[0])
+            continue
+        try:
+            file_path = export_group_csv(group_name, compression=compression)
+            if file_path:
+                exports[key] = (file_path, now)
+                exported_files.append(file_path)
+            else:
+                errors.append(f"Failed to export {group_name}")
+        except Exception as e:
+            errors.append(f"{group_name}: {str(e)}")
+    
+    return tuple(exported_files), tuple(errors)
 
 # Export options
 st.subheader("📦 Export Options")
@@ -42,7 +99,7 @@ if st.session_state.get('selected_group'):
     with single_col1:
         if st.button("📊 Export Group CSV", use_container_width=True):
             try:
-                file_path = export_group_csv(selected_group)
+                file_path = export_group_csv(selected_group, compression=selected_compression())
                 if file_path:
                     st.success(f"✅ CSV exported successfully!")
                     st.code(f"File: {file_path}")
@@ -59,11 +116,20 @@ if st.session_state.get('selected_group'):
                     st.success(f"✅ Copy pack exported successfully!")
                     st.code(f"File: {file_path}")
                     
-                    # Show preview
+                    # Show preview of the first few top-level keys; full payload via download
                     with st.expander("📄 Preview Copy Pack"):
                         with open(file_path, 'r') as f:
                             copy_data = json.load(f)
-                        st.json(copy_data)
+                        preview_keys = list(copy_data)[:PREVIEW_KEYS]
+                        st.json({k: copy_data[k] for k in preview_keys})
+                        if len(copy_data) > len(preview_keys):
+                            st.caption(f"Showing {len(preview_keys)} of {len(copy_data)} top-level keys")
+                        st.download_button(
+                            "⬇️ Download full copy pack",
+                            data=json.dumps(copy_data, indent=2),
+                            file_name=Path(file_path).name,
+                            mime="application/json"
+                        )
                 else:
                     st.error("Failed to export copy pack")
             except Exception as e:
@@ -72,7 +138,7 @@ if st.session_state.get('selected_group'):
     with single_col3:
         if st.button("📋 Generate Manifest", use_container_width=True):
             try:
-                file_path = export_manifest()
+                file_path = generate_manifest_once()
                 if file_path:
                     st.success(f"✅ Manifest generated successfully!")
                     st.code(f"File: {file_path}")
@@ -89,18 +155,7 @@ bulk_col1, bulk_col2, bulk_col3 = st.columns(3)
 
 with bulk_col1:
     if st.button("📊 Export All CSVs", use_container_width=True):
-        exported_files = []
-        errors = []
-        
-        for group_name in groups.keys():
-            try:
-                file_path = export_group_csv(group_name)
-                if file_path:
-                    exported_files.append(file_path)
-                else:
-                    errors.append(f"Failed to export {group_name}")
-            except Exception as e:
-                errors.append(f"{group_name}: {str(e)}")
+        exported_files, errors = export_all_csvs(GROUP_NAMES, selected_compression())
         
         if exported_files:
             st.success(f"✅ Exported {len(exported_files)} CSV files!")
@@ -118,7 +173,7 @@ with bulk_col2:
         exported_files = []
         errors = []
         
-        for group_name in groups.keys():
+        for group_name in GROUP_NAMES:
             try:
                 file_path = export_copy_pack(group_name)
                 if file_path:
@@ -144,18 +199,11 @@ with bulk_col3:
         st.info("🔄 Creating full export package...")
         
         # Export all CSVs
-        csv_files = []
-        for group_name in groups.keys():
-            try:
-                file_path = export_group_csv(group_name)
-                if file_path:
-                    csv_files.append(file_path)
-            except:
-                pass
+        csv_files, _ = export_all_csvs(GROUP_NAMES, selected_compression())
         
         # Export all copy packs  
         copy_files = []
-        for group_name in groups.keys():
+        for group_name in GROUP_NAMES:
             try:
                 file_path = export_copy_pack(group_name)
                 if file_path:
@@ -165,7 +213,7 @@ with bulk_col3:
         
         # Generate manifest
         try:
-            manifest_path = export_manifest()
+            manifest_path = generate_manifest_once()
         except:
             manifest_path = None
         
@@ -196,47 +244,43 @@ st.markdown("---")
 st.subheader("📋 Export Summary")
 
 # Check existing exports
-exports_dir = Path(__file__).parent.parent.parent / "exports"
-if exports_dir.exists():
-    files = list(exports_dir.glob("*"))
+files = list(exports_dir.glob("*"))
+
+if files:
+    # Filter by type
+    csv_files = [f for f in files if f.suffix == '.csv' or f.suffixes[-2:] in (['.csv', '.gz'], ['.csv', '.zip'])]
+    json_files = [f for f in files if f.suffix == '.json']
+    
+    summary_col1, summary_col2, summary_col3 = st.columns(3)
     
-    if files:
-        # Filter by type
-        csv_files = [f for f in files if f.suffix == '.csv']
-        json_files = [f for f in files if f.suffix == '.json']
+    with summary_col1:
+        st.metric("CSV Files", len(csv_files))
         
-        summary_col1, summary_col2, summary_col3 = st.columns(3)
+    with summary_col2:
+        st.metric("JSON Files", len(json_files))
         
-        with summary_col1:
-            st.metric("CSV Files", len(csv_files))
-            
-        with summary_col2:
-            st.metric("JSON Files", len(json_files))
-            
-        with summary_col3:
-            st.metric("Total Files", len(files))
+    with summary_col3:
+        st.metric("Total Files", len(files))
+    
+    # File browser
+    with st.expander("📁 Browse Export Directory"):
+        file_data = []
+        for file_path in sorted(files, key=lambda x: x.stat().st_mtime, reverse=True):
+            stat = file_path.stat()
+            file_data.append({
+                "File": file_path.name,
+                "Type": file_path.suffix.upper() or "DIR",
+                "Size": f"{stat.st_size / 1024:.1f} KB" if stat.st_size > 0 else "0 KB",
+                "Modified": datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M")
+            })
         
-        # File browser
-        with st.expander("📁 Browse Export Directory"):
-            file_data = []
-            for file_path in sorted(files, key=lambda x: x.stat().st_mtime, reverse=True):
-                stat = file_path.stat()
-                file_data.append({
-                    "File": file_path.name,
-                    "Type": file_path.suffix.upper() or "DIR",
-                    "Size": f"{stat.st_size / 1024:.1f} KB" if stat.st_size > 0 else "0 KB",
-                    "Modified": datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M")
-                })
-            
-            if file_data:
-                files_df = pd.DataFrame(file_data)
-                st.dataframe(files_df, hide_index=True, use_container_width=True)
-            else:
-                st.info("No files in export directory")
-    else:
-        st.info("No exports found. Create your first export above!")
+        if file_data:
+            files_df = pd.DataFrame(file_data)
+            st.dataframe(files_df, hide_index=True, use_container_width=True)
+        else:
+            st.info("No files in export directory")
 else:
-    st.warning("Export directory not found.")
+    st.info("No exports found. Create your first export above!")
 
 # Export configuration
 st.markdown("---")
@@ -258,7 +302,8 @@ with settings_col2:
     compression = st.selectbox(
         "Compression",
         ["None", "ZIP", "GZIP"],
-        index=0
+        index=0,
+        key="export_compression"
     )
 
 # Advanced export options
@@ -15,11 +15,15 @@ Enhanced with:
 - Multi-channel message optimization
 - Comprehensive error handling and fallbacks
 """
-import os, json, math, hashlib, warnings, re
+import os, sys, json, math, hashlib, warnings, re, asyncio, time, atexit, importlib.util
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from collections import defaultdict
+from functools import lru_cache
+from bisect import bisect_right
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
 import httpx
@@ -51,13 +55,43 @@ try:
     from sklearn.preprocessing import StandardScaler, OneHotEncoder
     from sklearn.compose import ColumnTransformer
     from sklearn.pipeline import Pipeline
-    from sklearn.cluster import KMeans
+    from sklearn.cluster import KMeans, MiniBatchKMeans
     from sklearn.neighbors import NearestNeighbors
+    import joblib
     SKLEARN_AVAILABLE = True
 except ImportError:
     SKLEARN_AVAILABLE = False
     print("⚠️ scikit-learn not available - advanced clustering disabled")
 
+# Numba fuses the scoring formulas into one parallel pass, plain NumPy otherwise
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# PyArrow for multi-threaded CSV parsing, falls back to the default pandas engine
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# orjson for faster JSON parsing/serialization, stdlib json otherwise
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# FAISS for kNN search, falls back to sklearn NearestNeighbors
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
 WORKDIR = Path('.')
 EXPORTS = WORKDIR / 'exports'
 EXPORTS.mkdir(exist_ok=True)
@@ -66,55 +100,111 @@ BRAND_DIR = WORKDIR / 'brand_kit'
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY','')
 OPENAI_API_BASE = os.getenv('OPENAI_API_BASE','https://api.openai.com/v1')
 LIVE_ONLY = os.getenv('LIVE_ONLY','0') == '1'
+CHURN_VERBOSE = os.getenv('CHURN_VERBOSE','0') == '1'
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '32'))
+LLM_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+# One keep-alive connection pool for every sync LLM call (HTTP/2 when h2 is installed)
+HTTP_CLIENT = httpx.Client(http2=importlib.util.find_spec('h2') is not None, timeout=20, limits=LLM_HTTP_LIMITS)
+atexit.register(HTTP_CLIENT.close)
+
+@lru_cache(maxsize=None)
+def get_openai_client():
+    """Shared OpenAI SDK client riding on HTTP_CLIENT; created on first use since it needs an API key"""
+    return OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_API_BASE, http_client=HTTP_CLIENT)
+
+def json_loads(s):
+    """Parse JSON text with orjson when installed"""
+    return orjson.loads(s) if ORJSON_AVAILABLE else json.loads(s)
+
+def json_dumps(obj, indent=False):
+    """Serialize to JSON text with orjson when installed; indent=True gives 2-space pretty output"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option).decode('utf-8')
+    return json.dumps(obj, indent=2 if indent else None)
+
+def write_json(path, obj):
+    """Write obj as pretty JSON in one call (orjson bytes straight to disk when installed)"""
+    path = Path(path)
+    if ORJSON_AVAILABLE:
+        path.write_bytes(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2))
+    else:
+        path.write_text(json.dumps(obj, indent=2), encoding='utf-8')
 
 # === Brand Kit & RAG System ===
+BRAND_FILES = ['brand_overview.md', 'brand_voice.md', 'compliance.md', 'offer_policy.md']
+
+def _brand_kit_version():
+    """mtimes of the brand_kit documents; editing any of them invalidates the cached docs"""
+    versions = []
+    for filename in BRAND_FILES:
+        try:
+            versions.append((BRAND_DIR / filename).stat().st_mtime_ns)
+        except OSError:
+            versions.append(None)
+    return tuple(versions)
+
 def load_brand_documents():
-    """Load brand documents for RAG-enhanced messaging"""
+    """Load brand documents for RAG-enhanced messaging (re-read only when brand_kit changes, returned read-only)"""
+    return _load_brand_documents(_brand_kit_version())
+
+@lru_cache(maxsize=1)
+def _load_brand_documents(version):
     brand_docs = {}
-    
-    brand_files = ['brand_overview.md', 'brand_voice.md', 'compliance.md', 'offer_policy.md']
     missing_files = []
     
-    for filename in brand_files:
+    for filename in BRAND_FILES:
         filepath = BRAND_DIR / filename
         if filepath.exists():
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if not content.strip():
-                    raise RuntimeError(f"❌ Brand document is empty: {filename}. Please provide content for all brand documents.")
-                brand_docs[filename] = content
-                print(f"✅ Loaded brand document: {filename}")
+            content = filepath.read_text(encoding='utf-8')
+            if not content.strip():
+                raise RuntimeError(f"❌ Brand document is empty: {filename}. Please provide content for all brand documents.")
+            brand_docs[filename] = content
+            print(f"✅ Loaded brand document: {filename}")
         else:
             missing_files.append(filename)
     
     if missing_files:
         raise RuntimeError(f"❌ Missing required brand documents: {', '.join(missing_files)}. Run 'python tools/validate_brandkit.py' to check. Ensure all four files exist in brand_kit/ directory.")
     
-    return brand_docs
+    return MappingProxyType(brand_docs)
+
+# Map archetypes to relevant brand guidance
+ARCHETYPE_KEYWORDS = {
+    "ValueSensitive": ["save", "bundled", "smarter", "upgrade"],
+    "Loyalist": ["priority support", "curated", "favorites", "exclusive"],
+    "Premium": ["upgrade", "premium", "priority", "curated"],
+    "AtRisk": ["convenient", "care", "support", "reassuring"],
+    "ServiceSensitive": ["support", "setup", "help", "service"]
+}
+DEFAULT_ARCHETYPE_KEYWORDS = ["convenient", "care"]
+ARCHETYPE_PATTERNS = {
+    archetype: re.compile('|'.join(map(re.escape, keywords)), re.I)
+    for archetype, keywords in [*ARCHETYPE_KEYWORDS.items(), (None, DEFAULT_ARCHETYPE_KEYWORDS)]
+}
+
+@lru_cache(maxsize=None)
+def build_brand_keyword_index(docs: tuple) -> Dict[Optional[str], List[str]]:
+    """Scan brand doc lines once and bucket them by matching archetype (None = default keywords)"""
+    index = defaultdict(list)
+    for doc_name, content in docs:
+        # Offsets of each line start; regex hits over the whole doc map back to lines via bisect
+        line_starts = [0] + [m.end() for m in re.finditer('\n', content)]
+        line_ends = line_starts[1:] + [len(content) + 1]
+        for archetype, pattern in ARCHETYPE_PATTERNS.items():
+            last_line = -1
+            for match in pattern.finditer(content):
+                i = bisect_right(line_starts, match.start()) - 1
+                if i != last_line:
+                    index[archetype].append(content[line_starts[i]:line_ends[i] - 1].strip())
+                    last_line = i
+    return dict(index)
 
 def get_brand_context_for_archetype(archetype: str, brand_docs: dict) -> str:
     """Retrieve relevant brand context for archetype via simple RAG"""
-    
-    # Map archetypes to relevant brand guidance
-    archetype_mapping = {
-        "ValueSensitive": ["save", "bundled", "smarter", "upgrade"],
-        "Loyalist": ["priority support", "curated", "favorites", "exclusive"],
-        "Premium": ["upgrade", "premium", "priority", "curated"],
-        "AtRisk": ["convenient", "care", "support", "reassuring"],
-        "ServiceSensitive": ["support", "setup", "help", "service"]
-    }
-    
-    relevant_keywords = archetype_mapping.get(archetype, ["convenient", "care"])
-    
-    # Extract relevant sections from brand docs
-    context_sections = []
-    
-    for doc_name, content in brand_docs.items():
-        # Simple keyword matching for relevant content
-        lines = content.split('\n')
-        for line in lines:
-            if any(keyword.lower() in line.lower() for keyword in relevant_keywords):
-                context_sections.append(line.strip())
+    index = build_brand_keyword_index(tuple(brand_docs.items()))
+    context_sections = index.get(archetype if archetype in ARCHETYPE_PATTERNS else None, [])
     
     if context_sections:
         return "Brand guidance: " + " | ".join(context_sections[:3])  # Top 3 matches
@@ -138,7 +228,14 @@ def load_data():
     # Load data
     try:
         if str(path).lower().endswith('.csv'):
-            df_raw = pd.read_csv(path)
+            df_raw = None
+            if PYARROW_AVAILABLE:
+                try:
+                    df_raw = pd.read_csv(path, engine='pyarrow')
+                except Exception:
+                    df_raw = None
+            if df_raw is None:
+                df_raw = pd.read_csv(path)
         elif str(path).lower().endswith(('.xlsx', '.xls')):
             df_raw = pd.read_excel(path)
         else:
@@ -149,19 +246,23 @@ def load_data():
     except Exception as e:
         raise RuntimeError(f"❌ Failed to load dataset: {str(e)}")
     
-    # Process summary - before
-    rows_before = len(df_raw)
-    null_before = df_raw.isnull().sum().sum()
-    duplicates_before = df_raw.duplicated().sum()
-    
-    print(f"📋 Pre-processing summary:")
-    print(f"   • Rows: {rows_before:,}")
-    print(f"   • Null values: {null_before:,}")
-    print(f"   • Duplicate rows: {duplicates_before:,}")
-    
     # Canonicalize columns
     df = canonicalize_columns(df_raw)
     
+    # Process summary - before (duplicates are only ever resolved on CustomerID)
+    rows_before = len(df)
+    if CHURN_VERBOSE:
+        null_before = df.isnull().sum().sum()
+        if 'CustomerID' in df.columns:
+            duplicates_before = df['CustomerID'].duplicated().sum()
+        else:
+            duplicates_before = df.duplicated().sum()
+        
+        print(f"📋 Pre-processing summary:")
+        print(f"   • Rows: {rows_before:,}")
+        print(f"   • Null values: {null_before:,}")
+        print(f"   • Duplicate CustomerIDs: {duplicates_before:,}")
+    
     # Check mandatory columns
     mandatory_cols = [
         'CustomerID', 'OrderCount', 'HourSpendOnApp', 'NumberOfDeviceRegistered', 
@@ -191,7 +292,8 @@ def load_data():
     
     for col in numeric_cols:
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+            if not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors='coerce')
             median_val = df[col].median()
             nulls_filled = df[col].isnull().sum()
             df[col] = df[col].fillna(median_val)
@@ -207,16 +309,23 @@ def load_data():
     
     # Final summary
     rows_after = len(df)
-    null_after = df.isnull().sum().sum()
     
     print(f"✅ Post-processing summary:")
     print(f"   • Final rows: {rows_after:,}")
-    print(f"   • Remaining nulls: {null_after:,}")
+    if CHURN_VERBOSE:
+        print(f"   • Remaining nulls: {df.isnull().sum().sum():,}")
     print(f"   • Processing complete")
     
     return df
 
 
+def write_csv(df, path):
+    """Write df to CSV without its index; pyarrow's C++ writer when installed, pandas otherwise"""
+    if PYARROW_AVAILABLE:
+        pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), str(path))
+    else:
+        df.to_csv(path, index=False)
+
 def canonicalize_columns(df):
     COLUMN_MAP = {
         'customer_id': 'CustomerID', 'customerid': 'CustomerID', 'churned': 'Churn', 'complaints': 'Complain',
@@ -229,15 +338,64 @@ def canonicalize_columns(df):
     return df.rename(columns=m)
 
 
-def min_max_scale(s):
-    try:
-        s = (s - s.min()) / (s.max() - s.min())
-        return s.fillna(0) if hasattr(s,'fillna') else s
-    except Exception:
-        arr = np.array(s,dtype=float)
-        if arr.max()==arr.min():
-            return np.zeros_like(arr)
-        return (arr - arr.min())/(arr.max()-arr.min())
+def min_max_scale(arr):
+    """Min-max scale an array to [0,1]; constant or all-NaN input maps to zeros"""
+    arr = np.asarray(arr, dtype=float)
+    if arr.size == 0 or np.isnan(arr).all():
+        return np.zeros_like(arr)
+    lo = np.nanmin(arr)
+    rng = np.nanmax(arr) - lo
+    if rng == 0:
+        return np.zeros_like(arr)
+    return np.nan_to_num((arr - lo) / rng, nan=0.0)
+
+def score_kernel(recency_s, satisfaction, complain, monetary_s, order_s, tenure_s, engagement_s, smc_s):
+    """Return (churn_risk, value_score, ResurrectionScore) arrays from the scaled feature arrays"""
+    # Smoothed churn risk: higher when recency is high, lower with satisfaction
+    # Use a logistic transform to compress extremes
+    sat = (satisfaction - 1) / 4.0  # 0-1
+    # risk_raw in 0-1 where higher = more at-risk
+    risk_raw = 0.6 * recency_s + 0.3 * (1 - sat) + 0.1 * np.nan_to_num(complain)
+    # logistic smooth
+    churn_risk = (1 / (1 + np.exp(-6 * (risk_raw - 0.5)))) * 10
+
+    # Improved value score: blend revenue proxy and order frequency with winsorization
+    mv = np.clip(monetary_s, 0, 1)
+    oc = np.clip(order_s, 0, 1)
+    value_score = (0.7 * mv + 0.3 * oc) * 10
+
+    resurrection = np.clip(
+        0.30 * order_s +
+        0.20 * monetary_s +
+        0.15 * tenure_s +
+        0.15 * engagement_s -
+        0.15 * recency_s +
+        0.10 * smc_s,
+        0, 1
+    )
+    return churn_risk, value_score, resurrection
+
+if NUMBA_AVAILABLE:
+    # fastmath without nnan/ninf: LLVM may otherwise drop the NaN handling (nan_to_num) above
+    score_kernel = njit(parallel=True, fastmath={'reassoc', 'contract', 'arcp'}, cache=True)(score_kernel)
+
+# Narrow dtypes for the raw/derived columns carried through summaries, exports and the cache
+_NUMERIC_DTYPES = {'DaySinceLastOrder':'int32', 'OrderCount':'int32', 'Tenure':'int32', 'CouponUsed':'int16',
+                   'MonetaryValue':'float32', 'Engagement':'float32', 'CashbackAmount':'float32'}
+
+def downcast_numeric(df):
+    """Return df with _NUMERIC_DTYPES applied; integer targets only when every value is a whole number in range"""
+    casts = {}
+    for c, dtype in _NUMERIC_DTYPES.items():
+        if c not in df.columns or not pd.api.types.is_numeric_dtype(df[c]):
+            continue
+        v = df[c].to_numpy()
+        if np.dtype(dtype).kind == 'i':
+            info = np.iinfo(dtype)
+            if len(v) and not (np.isfinite(v).all() and (v == np.round(v)).all() and info.min <= v.min() and v.max() <= info.max):
+                continue
+        casts[c] = dtype
+    return df.astype(casts) if casts else df
 
 # --- Scoring ---
 def compute_features(df):
@@ -250,46 +408,36 @@ def compute_features(df):
                 'NumberOfDeviceRegistered', 'SatisfactionScore', 'Complain',
                 'OrderCount', 'DaySinceLastOrder', 'CouponUsed', 'CashbackAmount',
                 'OrderAmountHikeFromlastYear']
-    for c in num_cols:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors='coerce')
-            df[c] = df[c].fillna(df[c].median())
+    present = [c for c in num_cols if c in df.columns]
+    if present:
+        unparsed = [c for c in present if not pd.api.types.is_numeric_dtype(df[c])]
+        if unparsed:
+            df[unparsed] = df[unparsed].apply(pd.to_numeric, errors='coerce')
+        df[present] = df[present].fillna(df[present].median())
     for c in ['PreferredLoginDevice','PreferredPaymentMode','PreferedOrderCat']:
         if c in df.columns:
             df[c] = df[c].fillna('Unknown')
-    # derived
-    safe = lambda d,k: d[k] if k in d.columns else 0
-    df['MonetaryValue'] = safe(df,'CashbackAmount') + safe(df,'CouponUsed') + safe(df,'OrderAmountHikeFromlastYear')
-    df['Engagement'] = safe(df,'HourSpendOnApp') + 0.5*safe(df,'NumberOfDeviceRegistered')
-    df['SatisfactionMinusComplain'] = safe(df,'SatisfactionScore') - 2*safe(df,'Complain')
-    df['OrderCount_s'] = min_max_scale(safe(df,'OrderCount'))
-    df['MonetaryValue_s'] = min_max_scale(df['MonetaryValue'])
-    df['Tenure_s'] = min_max_scale(safe(df,'Tenure'))
-    df['Engagement_s'] = min_max_scale(df['Engagement'])
-    df['Recency_s'] = min_max_scale(safe(df,'DaySinceLastOrder'))
-    df['SatMinusComplain_s'] = min_max_scale(df['SatisfactionMinusComplain'])
-    # Smoothed churn risk: higher when recency is high, lower with satisfaction
-    # Use a logistic transform to compress extremes
-    rec = df['Recency_s'].fillna(0)
-    sat = (df['SatisfactionScore'] - 1) / 4.0  # 0-1
-    # risk_raw in 0-1 where higher = more at-risk
-    risk_raw = 0.6 * rec + 0.3 * (1 - sat) + 0.1 * (df['Complain'].fillna(0))
-    # logistic smooth
-    df['churn_risk'] = (1 / (1 + np.exp(-6 * (risk_raw - 0.5)))) * 10
-
-    # Improved value score: blend revenue proxy and order frequency with winsorization
-    mv = df['MonetaryValue_s'].clip(0,1)
-    oc = df['OrderCount_s'].clip(0,1)
-    df['value_score'] = (0.7 * mv + 0.3 * oc) * 10
-
-    df['ResurrectionScore'] = (
-        0.30 * df['OrderCount_s'] +
-        0.20 * df['MonetaryValue_s'] +
-        0.15 * df['Tenure_s'] +
-        0.15 * df['Engagement_s'] -
-        0.15 * df['Recency_s'] +
-        0.10 * df['SatMinusComplain_s']
-    ).clip(0,1)
+    # derived: pull raw arrays once, missing columns read as zeros
+    n = len(df)
+    col = lambda k: df[k].to_numpy(dtype=float) if k in df.columns else np.zeros(n)
+    monetary = col('CashbackAmount') + col('CouponUsed') + col('OrderAmountHikeFromlastYear')
+    engagement = col('HourSpendOnApp') + 0.5*col('NumberOfDeviceRegistered')
+    satisfaction = col('SatisfactionScore')
+    complain = col('Complain')
+    sat_minus_complain = satisfaction - 2*complain
+    order_s = min_max_scale(col('OrderCount'))
+    monetary_s = min_max_scale(monetary)
+    tenure_s = min_max_scale(col('Tenure'))
+    engagement_s = min_max_scale(engagement)
+    recency_s = min_max_scale(col('DaySinceLastOrder'))
+    smc_s = min_max_scale(sat_minus_complain)
+    df[['MonetaryValue', 'Engagement', 'SatisfactionMinusComplain',
+        'OrderCount_s', 'MonetaryValue_s', 'Tenure_s', 'Engagement_s', 'Recency_s', 'SatMinusComplain_s']] = np.column_stack(
+        [monetary, engagement, sat_minus_complain, order_s, monetary_s, tenure_s, engagement_s, recency_s, smc_s]
+    )
+    df['churn_risk'], df['value_score'], df['ResurrectionScore'] = score_kernel(
+        recency_s, satisfaction, complain, monetary_s, order_s, tenure_s, engagement_s, smc_s
+    )
     
     # Add Status field for cohort filtering
     df['Status'] = mark_status(df)
@@ -313,36 +461,43 @@ def create_micro_cohorts(df):
         print("Not enough numeric features for micro-cohort clustering")
         return df, None, None, None
     
-    # Prepare feature matrix
+    # Prepare feature matrix; numeric features go in as one float32 block so
+    # StandardScaler receives a column-major (Fortran-order) array
     if CAT_FEATS:
         preprocessor = ColumnTransformer([
             ("num", StandardScaler(), NUM_FEATS),
             ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), CAT_FEATS)
         ], remainder="drop")
-        X = df[NUM_FEATS + CAT_FEATS].copy()
     else:
         preprocessor = ColumnTransformer([
             ("num", StandardScaler(), NUM_FEATS),
         ], remainder="drop")
-        X = df[NUM_FEATS].copy()
+    X = pd.DataFrame(np.asfortranarray(df[NUM_FEATS].to_numpy(dtype=np.float32)),
+                     columns=NUM_FEATS, index=df.index)
+    for c in CAT_FEATS:
+        X[c] = df[c]
     
     # Determine number of clusters
     k = min(100, max(2, int(len(df)/10)))
     
-    # Create pipeline
+    # Create pipeline (fitted step by step below); mini-batch KMeans keeps the fit tractable on large datasets
+    if len(df) > 50_000:
+        kmeans = MiniBatchKMeans(n_clusters=k, random_state=42, batch_size=4096, n_init=3)
+    else:
+        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
     pipeline = Pipeline([
         ("preprocessor", preprocessor), 
-        ("kmeans", KMeans(n_clusters=k, random_state=42, n_init=10))
+        ("kmeans", kmeans)
     ])
     
     try:
-        # Fit and predict
-        df['CohortID'] = pipeline.fit_predict(X)
+        # Transform once; KMeans and the kNN index share the same matrix
+        Xt = preprocessor.fit_transform(X)
+        df['CohortID'] = kmeans.fit(Xt).labels_
         
         # Build kNN index for persona matching
-        X_transformed = preprocessor.fit_transform(X)
-        knn = NearestNeighbors(n_neighbors=15, metric='euclidean')
-        knn.fit(X_transformed)
+        knn = FaissKNN(n_neighbors=15) if FAISS_AVAILABLE else NearestNeighbors(n_neighbors=15, metric='euclidean')
+        knn.fit(Xt)
         
         print(f"✅ Built {k} micro-cohorts with ML clustering")
         return df, pipeline, knn, preprocessor
@@ -352,50 +507,155 @@ def create_micro_cohorts(df):
         df['CohortID'] = 0
         return df, None, None, None
 
-def summarize_micro_cohort(df_grp: pd.DataFrame) -> dict:
-    """Summarize a micro-cohort"""
-    return {
-        "size": int(len(df_grp)),
-        "avg_score": float(df_grp["ResurrectionScore"].mean()),
-        "avg_tenure": float(df_grp["Tenure"].mean()) if 'Tenure' in df_grp else 0,
-        "avg_recency": float(df_grp["DaySinceLastOrder"].mean()) if 'DaySinceLastOrder' in df_grp else 0,
-        "avg_engagement": float(df_grp["Engagement"].mean()) if 'Engagement' in df_grp else 0,
-        "avg_value": float(df_grp["MonetaryValue"].mean()) if 'MonetaryValue' in df_grp else 0,
-    }
+class FaissKNN:
+    """
+    NearestNeighbors-compatible (fit/kneighbors) euclidean kNN backed by FAISS.
+    Uses exact IndexFlatL2, or IndexIVFFlat once the data exceeds ivf_threshold rows.
+    """
+    def __init__(self, n_neighbors=15, ivf_threshold=10000, nprobe=8):
+        self.n_neighbors = n_neighbors
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.index = None
+        self._quantizer = None
+
+    def fit(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        d = X.shape[1]
+        if len(X) > self.ivf_threshold:
+            self._quantizer = faiss.IndexFlatL2(d)
+            index = faiss.IndexIVFFlat(self._quantizer, d, int(math.sqrt(len(X))))
+            index.train(X)
+            index.nprobe = self.nprobe
+        else:
+            index = faiss.IndexFlatL2(d)
+        index.add(X)
+        self.index = index
+        return self
+
+    def __getstate__(self):
+        # SWIG faiss.Index objects don't pickle; carry the index as its serialized bytes
+        state = self.__dict__.copy()
+        state['index'] = None if self.index is None else faiss.serialize_index(self.index)
+        state['_quantizer'] = None  # owned by the deserialized IVF index
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.index is not None:
+            self.index = faiss.deserialize_index(self.index)
+
+    def kneighbors(self, X, n_neighbors=None):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        k = min(n_neighbors or self.n_neighbors, self.index.ntotal)
+        sq_dists, idxs = self.index.search(X, k)
+        # IVF pads with -1 labels when the probed lists hold fewer than k vectors;
+        # widen the probe until every query has k hits (nprobe == nlist is exhaustive)
+        if isinstance(self.index, faiss.IndexIVF):
+            while (idxs < 0).any() and self.index.nprobe < self.index.nlist:
+                self.index.nprobe = min(self.index.nprobe * 2, self.index.nlist)
+                sq_dists, idxs = self.index.search(X, k)
+            self.index.nprobe = self.nprobe
+        return np.sqrt(np.maximum(sq_dists, 0)), idxs
+
+# Summary key -> source column; optional columns missing from the frame report 0
+SUMMARY_STATS = {
+    'avg_score': 'ResurrectionScore',
+    'avg_tenure': 'Tenure',
+    'avg_recency': 'DaySinceLastOrder',
+    'avg_engagement': 'Engagement',
+    'avg_value': 'MonetaryValue',
+}
+
+def summary_means(d: pd.DataFrame) -> dict:
+    """Size plus the SUMMARY_STATS column means, reduced in one pass over the frame"""
+    cols = ['ResurrectionScore'] + [c for c in list(SUMMARY_STATS.values())[1:] if c in d.columns]
+    means = d[cols].astype(np.float64).mean()  # accumulate narrowed columns in float64
+    return {'size': int(len(d)), **{k: float(means[c]) if c in means.index else 0 for k, c in SUMMARY_STATS.items()}}
+
+def _group_means_loop(codes, values, n_groups):
+    """Per-group column means in a single pass over the rows (compiled by Numba)"""
+    sums = np.zeros((n_groups, values.shape[1]))
+    counts = np.zeros(n_groups)
+    for i in range(codes.shape[0]):
+        g = codes[i]
+        counts[g] += 1
+        for j in range(values.shape[1]):
+            sums[g, j] += values[i, j]
+    return sums / counts.reshape(-1, 1), counts
+
+def _group_means_numpy(codes, values, n_groups):
+    """Per-group column means via one bincount per column"""
+    counts = np.bincount(codes, minlength=n_groups).astype(float)
+    sums = np.column_stack([np.bincount(codes, weights=values[:, j], minlength=n_groups) for j in range(values.shape[1])])
+    return sums / counts.reshape(-1, 1), counts
+
+group_means = njit(cache=True)(_group_means_loop) if NUMBA_AVAILABLE else _group_means_numpy
+
+def summarize_micro_cohorts(df: pd.DataFrame) -> dict:
+    """summary_means for every CohortID at once, keyed by cohort id"""
+    cols = ['ResurrectionScore'] + [c for c in list(SUMMARY_STATS.values())[1:] if c in df.columns]
+    ids, codes = np.unique(df['CohortID'].to_numpy(), return_inverse=True)
+    means, counts = group_means(codes.astype(np.int64), np.ascontiguousarray(df[cols].to_numpy(dtype=np.float64)), len(ids))
+    summaries = {}
+    for g, cohort_id in enumerate(ids.tolist()):
+        col_means = dict(zip(cols, means[g].tolist()))
+        summaries[cohort_id] = {'size': int(counts[g]), **{k: col_means.get(c, 0) for k, c in SUMMARY_STATS.items()}}
+    return summaries
 
 # --- Cohorts ---
 def mark_status(df):
     # Recalibrated status buckets based on dataset percentiles (few records >60 days)
-    x = df['DaySinceLastOrder'] if 'DaySinceLastOrder' in df.columns else pd.Series([0]*len(df), index=df.index)
-    st = pd.Series(['Active']*len(df), index=df.index)
-    # AtRisk: recent lapse but within a month
-    st[(x >= 7) & (x < 30)] = 'AtRisk'
-    # Churned: long lapse
-    st[x >= 30] = 'Churned'
-    return st
-
-def cohort_payment_sensitive(d):
+    # Active: <7 days, AtRisk: recent lapse but within a month, Churned: long lapse (missing counts as Active)
+    if 'DaySinceLastOrder' in df.columns:
+        x = pd.to_numeric(df['DaySinceLastOrder'], errors='coerce').to_numpy(dtype=float)
+    else:
+        x = np.zeros(len(df))
+    codes = np.where(np.isnan(x), 0, np.searchsorted([7, 30], x, side='right'))
+    return pd.Series(pd.Categorical.from_codes(codes, ['Active', 'AtRisk', 'Churned']), index=df.index)
+
+def cohort_thresholds(d):
+    """Cohort cut-offs computed once over the full frame and shared by every cohort filter"""
+    if len(d) == 0:
+        return {}
+    return {
+        'coupon_median': d['CouponUsed'].median(),
+        'cashback_median': d['CashbackAmount'].median(),
+        'engagement_p70': d['Engagement'].quantile(0.70),
+        'monetary_p70': d['MonetaryValue'].quantile(0.70),
+    }
+
+def cohort_payment_sensitive(d, thresholds=None):
     # Payment-sensitive: users who engage with coupons/cashback and show mid-range recency
     if len(d) == 0:
         return d
-    return d.query("(CouponUsed >= @d['CouponUsed'].median()) or (CashbackAmount >= @d['CashbackAmount'].median())")\
-            .query("DaySinceLastOrder >= 7 and DaySinceLastOrder <= 30")
+    t = thresholds or cohort_thresholds(d)
+    dslo = d['DaySinceLastOrder'].to_numpy()
+    mask = ((d['CouponUsed'].to_numpy() >= t['coupon_median']) | (d['CashbackAmount'].to_numpy() >= t['cashback_median'])) \
+           & (dslo >= 7) & (dslo <= 30)
+    return d[mask]
 
-def cohort_high_tenure_drop(d):
+def cohort_high_tenure_drop(d, thresholds=None):
     # High-tenure recent drop: longer-tenure customers who recently lapsed (within ~1 month)
-    return d.query("Tenure >= 12 and DaySinceLastOrder >= 7 and DaySinceLastOrder < 30") if len(d) else d
+    if len(d) == 0:
+        return d
+    dslo = d['DaySinceLastOrder'].to_numpy()
+    return d[(d['Tenure'].to_numpy() >= 12) & (dslo >= 7) & (dslo < 30)]
 
-def cohort_premium_lapsed(d):
+def cohort_premium_lapsed(d, thresholds=None):
     # Premium engagement lapsed: high-engagement users who have slowed recently
     if len(d) == 0:
         return d
-    thr = d['Engagement'].quantile(0.70)
-    return d.query("Engagement >= @thr and DaySinceLastOrder >= 5 and DaySinceLastOrder <= 20")
+    thr = (thresholds or cohort_thresholds(d))['engagement_p70']
+    dslo = d['DaySinceLastOrder'].to_numpy()
+    return d[(d['Engagement'].to_numpy() >= thr) & (dslo >= 5) & (dslo <= 20)]
 
-def cohort_atrisk_highvalue(d):
+def cohort_atrisk_highvalue(d, thresholds=None):
     # AtRisk High-Value: AtRisk status (recalibrated) and high monetary value
-    thr = d['MonetaryValue'].quantile(0.70) if len(d) else 0
-    base = d[(d['Status'] == 'AtRisk') & (d['MonetaryValue'] >= thr)] if len(d) else d
+    if len(d) == 0:
+        return d.sort_values('ResurrectionScore', ascending=False)
+    thr = (thresholds or cohort_thresholds(d))['monetary_p70']
+    base = d[(d['Status'] == 'AtRisk').to_numpy() & (d['MonetaryValue'].to_numpy() >= thr)]
     return base.sort_values('ResurrectionScore', ascending=False)
 
 COHORTS = {
@@ -407,8 +667,8 @@ COHORTS = {
 
 def cohort_summary(d):
     if len(d)==0:
-        return {'size':0,'avg_score':0,'avg_tenure':0,'avg_recency':0,'avg_engagement':0,'avg_value':0}
-    return {'size':int(len(d)),'avg_score':float(d['ResurrectionScore'].mean()),'avg_tenure':float(d['Tenure'].mean()) if 'Tenure' in d else 0,'avg_recency':float(d['DaySinceLastOrder'].mean()) if 'DaySinceLastOrder' in d else 0,'avg_engagement':float(d['Engagement'].mean()) if 'Engagement' in d else 0,'avg_value':float(d['MonetaryValue'].mean()) if 'MonetaryValue' in d else 0}
+        return {'size':0, **{k: 0 for k in SUMMARY_STATS}}
+    return summary_means(d)
 
 # --- Brand corpus + deterministic embeddings ---
 
@@ -428,51 +688,290 @@ def load_corpus():
 EMBED_DIM = 256
 
 def deterministic_embed(texts):
-    out=[]
-    for t in texts:
-        h = hashlib.sha256((t or '').encode('utf-8')).digest()
-        v = int.from_bytes(h,'big')
-        vals=[]
-        for i in range(EMBED_DIM):
-            v = (v * 6364136223846793005 + 1442695040888963407) & ((1<<64)-1)
-            vals.append(((v >> (i % 64)) & 0xFFFF)/65535.0)
-        out.append(vals)
-    return np.array(out)
+    """Deterministic pseudo-embeddings: SHAKE-256 output of each text read as uint16 in [0, 1]"""
+    raw = b''.join(hashlib.shake_256((t or '').encode('utf-8')).digest(EMBED_DIM * 2) for t in texts)
+    vals = np.frombuffer(raw, dtype='<u2').reshape(len(texts), EMBED_DIM)
+    return vals.astype(np.float32) / np.float32(65535.0)
 
 # Simple retrieval: cosine similarity
 from sklearn.neighbors import NearestNeighbors
 
+def quantize_int8(vecs):
+    """Symmetric per-row int8 quantization; returns (int8 codes, float32 per-row scale)"""
+    scale = np.abs(vecs).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    codes = np.clip(np.rint(vecs / scale[:, None]), -127, 127).astype(np.int8)
+    return codes, scale.astype(np.float32)
+
+def corpus_embeddings(texts):
+    """L2-normalized corpus embeddings"""
+    embs = deterministic_embed(texts)
+    return (embs / ( (embs**2).sum(axis=1, keepdims=True) ** 0.5 + 1e-12)).astype(np.float32)
+
 def build_retriever(corpus):
     texts = [c['text'] for c in corpus]
     if not texts:
         return None
-    embs = deterministic_embed(texts)
-    norm = embs / ( (embs**2).sum(axis=1, keepdims=True) ** 0.5 + 1e-12)
-    nn = NearestNeighbors(metric='cosine', algorithm='brute')
-    nn.fit(norm)
-    return {'nn':nn,'embeds':norm,'corpus':corpus}
-
-def retrieve(retriever, query, topk=3):
+    norm = corpus_embeddings(texts)
+    if FAISS_AVAILABLE:
+        # 8-bit scalar-quantized inner product on L2-normalized vectors ~= cosine similarity
+        index = faiss.IndexScalarQuantizer(EMBED_DIM, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(norm)
+        index.add(norm)
+        return {'index':index,'corpus':corpus}
+    codes, scale = quantize_int8(norm)
+    return {'embeds':codes,'scale':scale,'corpus':corpus}
+
+def retrieve_many(retriever, queries, topk=3):
+    """Top-k corpus docs for every query, embedded and scored as one batch"""
     if retriever is None:
+        return [[] for _ in queries]
+    if not queries:
         return []
-    qv = deterministic_embed([query])
-    qv = qv / ( (qv**2).sum(axis=1, keepdims=True) ** 0.5 + 1e-12)
-    dists, idxs = retriever['nn'].kneighbors(qv, n_neighbors=min(topk, len(retriever['corpus'])))
-    out=[]
-    for i in idxs[0]:
-        out.append(retriever['corpus'][i])
-    return out
+    qv = deterministic_embed(queries)
+    qv = (qv / ( (qv**2).sum(axis=1, keepdims=True) ** 0.5 + 1e-12)).astype(np.float32)
+    k = min(topk, len(retriever['corpus']))
+    if 'index' in retriever:
+        _, idxs = retriever['index'].search(qv, k)
+    else:
+        # int8 dot products accumulated in int32, rescaled per doc; the query scale doesn't affect ranking
+        q_codes, _ = quantize_int8(qv)
+        scores = (q_codes.astype(np.int32) @ retriever['embeds'].astype(np.int32).T) * retriever['scale']
+        idxs = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+    corpus = retriever['corpus']
+    return [[corpus[i] for i in row] for row in idxs]
+
+def retrieve(retriever, query, topk=3):
+    return retrieve_many(retriever, [query], topk)[0]
 
 # --- LLM helpers (httpx to OpenAI chat) ---
 
-def call_chat(messages, model='gpt-4o-mini', temperature=0.4, timeout=20):
+LLM_MAX_RETRIES = 5
+MAX_RPM = int(os.getenv('MAX_RPM', '500'))
+MAX_TPM = int(os.getenv('MAX_TPM', '200000'))
+LLM_CACHE = os.getenv('LLM_CACHE', '1') == '1'
+LLM_CACHE_PATH = EXPORTS / 'llm_cache.jsonl'
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+
+def _chat_payload(messages, model, temperature, max_tokens=None):
+    payload = {'model': model, 'messages': messages, 'temperature': temperature}
+    if max_tokens:
+        payload['max_tokens'] = max_tokens
+    return payload
+
+def _chat_headers():
+    return {'Authorization': f'Bearer {OPENAI_API_KEY}', 'Content-Type':'application/json'}
+
+def _post_chat(payload, timeout=20):
+    """POST to chat completions, retrying 429/5xx with exponential backoff"""
+    for attempt in range(LLM_MAX_RETRIES):
+        r = HTTP_CLIENT.post(OPENAI_API_BASE + '/chat/completions', json=payload, headers=_chat_headers(), timeout=timeout)
+        if (r.status_code == 429 or r.status_code >= 500) and attempt < LLM_MAX_RETRIES - 1:
+            time.sleep(2 ** attempt)
+            continue
+        r.raise_for_status()
+        return r.json()
+
+async def acall_chat(messages, model='gpt-4o-mini', temperature=0.4, timeout=20, client=None, max_tokens=None):
+    """Async sibling of _post_chat; pass a shared httpx.AsyncClient to reuse connections.
+
+    Retries 429/5xx responses with exponential backoff, up to LLM_MAX_RETRIES attempts.
+    """
     if not OPENAI_API_KEY:
         return None
-    payload = {'model': model, 'messages': messages, 'temperature': temperature}
-    headers = {'Authorization': f'Bearer {OPENAI_API_KEY}', 'Content-Type':'application/json'}
-    r = httpx.post(OPENAI_API_BASE + '/chat/completions', json=payload, headers=headers, timeout=timeout)
-    r.raise_for_status()
-    return r.json()
+    if client is None:
+        async with httpx.AsyncClient(timeout=timeout) as c:
+            return await acall_chat(messages, model, temperature, timeout, client=c, max_tokens=max_tokens)
+    payload = _chat_payload(messages, model, temperature, max_tokens)
+    for attempt in range(LLM_MAX_RETRIES):
+        r = await client.post(OPENAI_API_BASE + '/chat/completions', json=payload, headers=_chat_headers(), timeout=timeout)
+        if (r.status_code == 429 or r.status_code >= 500) and attempt < LLM_MAX_RETRIES - 1:
+            await asyncio.sleep(2 ** attempt)
+            continue
+        r.raise_for_status()
+        return r.json()
+
+async def gather_llm(fn, items):
+    """Run `await fn(item, client=...)` for every item concurrently.
+
+    All calls share one httpx.AsyncClient and at most LLM_MAX_CONCURRENCY are in
+    flight. Results keep input order; failures are returned as exceptions.
+    """
+    sem = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    async with httpx.AsyncClient(limits=LLM_HTTP_LIMITS, timeout=20) as client:
+        async def _bounded(item):
+            async with sem:
+                return await fn(item, client=client)
+        return await asyncio.gather(*(_bounded(i) for i in items), return_exceptions=True)
+
+class JsonlCache:
+    """
+    Append-only key -> JSON value cache persisted as one jsonl line per entry.
+    Entries older than ttl seconds (when set) are treated as misses.
+    On first load the file is compacted: superseded, expired and unreadable lines are
+    dropped and only the newest max_entries entries (when set) are kept.
+    """
+    def __init__(self, path, ttl=None, enabled=True, max_entries=None):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            n_lines = 0
+            if self.path.exists():
+                with open(self.path, encoding='utf-8') as f:
+                    for line in f:
+                        n_lines += 1
+                        try:
+                            entry = json_loads(line)
+                            self._entries[entry['key']] = (entry.get('ts', 0), entry['response'])
+                        except (ValueError, KeyError):
+                            continue
+            self._prune()
+            if len(self._entries) < n_lines:
+                self._compact()
+        return self._entries
+
+    def _prune(self):
+        if self.ttl is not None:
+            cutoff = time.time() - self.ttl
+            self._entries = {k: v for k, v in self._entries.items() if v[0] >= cutoff}
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            newest = sorted(self._entries.items(), key=lambda kv: kv[1][0])[-self.max_entries:]
+            self._entries = dict(newest)
+
+    def _compact(self):
+        tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for key, (ts, value) in self._entries.items():
+                    f.write(json_dumps({'key': key, 'ts': ts, 'response': value}) + '\n')
+            os.replace(tmp, self.path)
+        except OSError as e:
+            tmp.unlink(missing_ok=True)
+            print(f"Failed to compact cache {self.path.name}: {e}")
+
+    def get(self, key):
+        if not self.enabled or (entry := self._load().get(key)) is None:
+            return None
+        ts, value = entry
+        if self.ttl is not None and time.time() - ts > self.ttl:
+            return None
+        return value
+
+    def set(self, key, value):
+        if not self.enabled or value is None:
+            return
+        ts = time.time()
+        self._load()[key] = (ts, value)
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json_dumps({'key': key, 'ts': ts, 'response': value}) + '\n')
+        except OSError as e:
+            print(f"Failed to write cache {self.path.name}: {e}")
+
+class LLMRequestQueue:
+    """
+    Rate-limit-aware front door for all chat completion calls.
+    - Request/token buckets refilled continuously from MAX_RPM / MAX_TPM
+    - Responses of opted-in (use_cache=True) deterministic calls such as judges and the
+      classifier are cached in exports/llm_cache.jsonl keyed by sha256(payload);
+      sampled generation is never cached
+    - Concurrent submits of the same cacheable payload are coalesced into one request
+    """
+    def __init__(self, max_rpm=MAX_RPM, max_tpm=MAX_TPM, cache_path=LLM_CACHE_PATH, use_cache=LLM_CACHE):
+        self.max_rpm = max_rpm
+        self.max_tpm = max_tpm
+        self.available_request_capacity = float(max_rpm)
+        self.available_token_capacity = float(max_tpm)
+        self.last_update = time.monotonic()
+        self.cache = JsonlCache(cache_path, enabled=use_cache, max_entries=LLM_CACHE_MAX_ENTRIES)
+        self._inflight = {}
+
+    # --- token buckets ---
+    def _take(self, tokens):
+        """Consume capacity if available; otherwise return seconds to wait."""
+        now = time.monotonic()
+        elapsed = now - self.last_update
+        self.last_update = now
+        self.available_request_capacity = min(self.max_rpm, self.available_request_capacity + self.max_rpm * elapsed / 60)
+        self.available_token_capacity = min(self.max_tpm, self.available_token_capacity + self.max_tpm * elapsed / 60)
+        tokens = min(tokens, self.max_tpm)
+        if self.available_request_capacity >= 1 and self.available_token_capacity >= tokens:
+            self.available_request_capacity -= 1
+            self.available_token_capacity -= tokens
+            return 0
+        return max((1 - self.available_request_capacity) * 60 / self.max_rpm,
+                   (tokens - self.available_token_capacity) * 60 / self.max_tpm, 0.01)
+
+    async def acquire(self, tokens):
+        while (wait := self._take(tokens)):
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self, tokens):
+        while (wait := self._take(tokens)):
+            time.sleep(wait)
+
+    @staticmethod
+    def estimate_tokens(payload):
+        return len(json.dumps(payload['messages'])) // 4 + (payload.get('max_tokens') or 0)
+
+    # --- response cache ---
+    @staticmethod
+    def cache_key(payload):
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def cached(self, key):
+        return self.cache.get(key)
+
+    def store(self, key, response):
+        self.cache.set(key, response)
+
+    # --- request APIs ---
+    def submit_blocking(self, messages, model='gpt-4o-mini', temperature=0.4, timeout=20, max_tokens=None, use_cache=False):
+        payload = _chat_payload(messages, model, temperature, max_tokens)
+        key = self.cache_key(payload)
+        if use_cache and (hit := self.cached(key)) is not None:
+            return hit
+        self.acquire_blocking(self.estimate_tokens(payload))
+        response = _post_chat(payload, timeout=timeout)
+        if use_cache:
+            self.store(key, response)
+        return response
+
+    async def submit(self, messages, model='gpt-4o-mini', temperature=0.4, timeout=20, max_tokens=None, use_cache=False, client=None):
+        payload = _chat_payload(messages, model, temperature, max_tokens)
+        key = self.cache_key(payload)
+        if use_cache and (hit := self.cached(key)) is not None:
+            return hit
+        if not use_cache:
+            await self.acquire(self.estimate_tokens(payload))
+            return await acall_chat(messages, model, temperature, timeout, client=client, max_tokens=max_tokens)
+        # Identical cacheable payloads already in flight share one request
+        if (pending := self._inflight.get(key)) is not None:
+            return await asyncio.shield(pending)
+        async def _send():
+            await self.acquire(self.estimate_tokens(payload))
+            response = await acall_chat(messages, model, temperature, timeout, client=client, max_tokens=max_tokens)
+            self.store(key, response)
+            return response
+        task = self._inflight[key] = asyncio.ensure_future(_send())
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._inflight.pop(key, None)
+
+LLM_QUEUE = LLMRequestQueue()
+
+def call_chat(messages, model='gpt-4o-mini', temperature=0.4, timeout=20, use_cache=False):
+    if not OPENAI_API_KEY:
+        return None
+    return LLM_QUEUE.submit_blocking(messages, model=model, temperature=temperature, timeout=timeout, use_cache=use_cache)
 
 # Test OpenAI connection
 def test_openai_connection():
@@ -484,7 +983,7 @@ def test_openai_connection():
         response = call_chat([
             {"role": "system", "content": "You are a helpful assistant."},
             {"role": "user", "content": "Say 'OK' if you can hear me."}
-        ], model='gpt-4o-mini', temperature=0)
+        ], model='gpt-4o-mini', temperature=0, use_cache=False)
         
         if response.get('choices') and response['choices'][0].get('message'):
             print("✅ OpenAI connection successful")
@@ -526,6 +1025,10 @@ def brand_safety(text: str) -> bool:
 
 def eval_message_with_llm(message: str, cohort_summary: dict) -> dict:
     """Evaluate message quality using LLM-as-Judge"""
+    return asyncio.run(aeval_message_with_llm(message, cohort_summary))
+
+async def aeval_message_with_llm(message: str, cohort_summary: dict, client=None) -> dict:
+    """Async LLM-as-Judge evaluation; see eval_message_with_llm"""
     prompt = f"""
 Cohort context: {json.dumps(cohort_summary)}
 Message to evaluate (title+body or text): ```{message}```
@@ -533,11 +1036,11 @@ Message to evaluate (title+body or text): ```{message}```
 """
     try:
         if OPENAI_API_KEY:
-            r = call_chat([
+            r = await LLM_QUEUE.submit([
                 {"role":"system","content":"You are a rigorous evaluator of marketing copy."},
                 {"role":"user","content":prompt}
-            ], model="gpt-4o-mini", temperature=0.0)
-            data = json.loads(r['choices'][0]['message']['content'])
+            ], model="gpt-4o-mini", temperature=0.0, use_cache=True, client=client)
+            data = json_loads(r['choices'][0]['message']['content'])
         else:
             # Fallback deterministic evaluation
             safety_score = 5 if brand_safety(message) else 0
@@ -571,17 +1074,26 @@ def regenerate_until_pass(generate_fn, max_tries=3, channel="email", summary=Non
         try:
             data = generate_fn()
             
-            # Evaluate each variant and keep best passing one
-            best_variant, best_score = None, -1
+            # Quick safety pre-check, then judge all safe variants concurrently
+            candidates = []
             for v in data.get("variants", []):
                 text = f"{v.get('title','')} {v.get('body','')}".strip()
-                
-                # Quick safety pre-check
                 if not brand_safety(text):
                     v["_eval"] = {"overall":0, "safety":0}
                     continue
-                    
-                scores = eval_message_with_llm(text, summary or {})
+                candidates.append((v, text))
+            
+            scores_list = asyncio.run(gather_llm(
+                lambda text, client: aeval_message_with_llm(text, summary or {}, client=client),
+                [text for _, text in candidates]
+            ))
+            
+            # Keep best passing variant
+            best_variant, best_score = None, -1
+            for (v, _), scores in zip(candidates, scores_list):
+                if isinstance(scores, BaseException):
+                    print(f"Evaluation failed: {scores}")
+                    continue
                 v["_eval"] = scores
                 
                 if passes_eval(scores) and scores["overall"] > best_score:
@@ -632,9 +1144,10 @@ def find_persona_matches(df, customer_id, knn_model, preprocessor):
         X_transformed = preprocessor.transform(X_customer)
         distances, indices = knn_model.kneighbors(X_transformed)
         
-        # Get similar customers
-        similar_ids = df.iloc[indices[0]].index.tolist()
-        return [(id_, float(dist)) for id_, dist in zip(similar_ids, distances[0])]
+        # Get similar customers (negative labels are "no neighbour" padding, never a row)
+        hits = indices[0] >= 0
+        similar_ids = df.iloc[indices[0][hits]].index.tolist()
+        return [(id_, float(dist)) for id_, dist in zip(similar_ids, distances[0][hits])]
         
     except Exception as e:
         print(f"Persona matching failed: {e}")
@@ -643,8 +1156,7 @@ def find_persona_matches(df, customer_id, knn_model, preprocessor):
 # === Archetype Classification ===
 ARCHETYPES = ["ValueSensitive","Loyalist","Premium","AtRisk","ServiceSensitive"]
 
-def classify_archetype(summary: dict) -> dict:
-    """Classify cohort into archetype using LLM"""
+def _classify(summary: dict) -> dict:
     prompt = f'''
 Classify this cohort into one of: ValueSensitive, Loyalist, Premium, AtRisk, ServiceSensitive.
 Use summary stats (tenure, recency, engagement, value) and return JSON:
@@ -652,60 +1164,67 @@ Use summary stats (tenure, recency, engagement, value) and return JSON:
 
 Cohort summary: {json.dumps(summary)}
 '''
-    try:
-        if OPENAI_API_KEY:
-            r = call_chat([
-                {"role":"system","content":"You are a rigorous cohort classifier."},
-                {"role":"user","content":prompt}
-            ], model="gpt-4o-mini", temperature=0.0)
-            data = json.loads(r['choices'][0]['message']['content'])
-            if data.get("archetype") not in ARCHETYPES:
-                data["archetype"] = "ValueSensitive"
-        else:
-            # Deterministic classification based on stats
-            size = summary.get('size', 0)
-            avg_value = summary.get('avg_value', 0)
-            avg_tenure = summary.get('avg_tenure', 0)
-            avg_recency = summary.get('avg_recency', 0)
-            
-            if avg_value > 0.7 and avg_tenure > 24:
-                archetype = "Premium"
-            elif avg_tenure > 18:
-                archetype = "Loyalist"  
-            elif avg_recency > 20:
-                archetype = "AtRisk"
-            else:
-                archetype = "ValueSensitive"
-                
-            data = {"archetype": archetype, "why": f"Based on stats: value={avg_value:.2f}, tenure={avg_tenure:.1f}mo, recency={avg_recency:.1f}d"}
+    if OPENAI_API_KEY:
+        r = call_chat([
+            {"role":"system","content":"You are a rigorous cohort classifier."},
+            {"role":"user","content":prompt}
+        ], model="gpt-4o-mini", temperature=0.0, use_cache=True)
+        data = json_loads(r['choices'][0]['message']['content'])
+        if data.get("archetype") not in ARCHETYPES:
+            data["archetype"] = "ValueSensitive"
         return data
+    # Deterministic classification based on stats
+    size = summary.get('size', 0)
+    avg_value = summary.get('avg_value', 0)
+    avg_tenure = summary.get('avg_tenure', 0)
+    avg_recency = summary.get('avg_recency', 0)
+    
+    if avg_value > 0.7 and avg_tenure > 24:
+        archetype = "Premium"
+    elif avg_tenure > 18:
+        archetype = "Loyalist"  
+    elif avg_recency > 20:
+        archetype = "AtRisk"
+    else:
+        archetype = "ValueSensitive"
+        
+    return {"archetype": archetype, "why": f"Based on stats: value={avg_value:.2f}, tenure={avg_tenure:.1f}mo, recency={avg_recency:.1f}d"}
+
+@lru_cache(maxsize=1024)
+def _classify_cached(sig: tuple) -> dict:
+    # failures raise and are therefore never cached
+    return _classify(dict(sig))
+
+def classify_archetype(summary: dict) -> dict:
+    """Classify cohort into archetype using LLM (memoized per process on the summary's scalar items)"""
+    try:
+        # key order is kept so the rebuilt summary renders the same prompt
+        sig = tuple(summary.items())
+        if all(isinstance(v, (int, float, str, bool)) or v is None for _, v in sig):
+            return dict(_classify_cached(sig))
+        return _classify(summary)
     except Exception:
         return {"archetype":"ValueSensitive","why":"Fallback classification"}
 
 # === LLM Insights Generation ===
-def generate_cohort_insights(cohort_name: str, cohort_summary: dict, brand_docs: dict) -> dict:
-    """Generate business insights for a cohort using LLM"""
-    
-    if not OPENAI_AVAILABLE:
-        return {
-            "insights": [
-                f"Cohort '{cohort_name}' has {cohort_summary.get('size', 0)} customers",
-                "Detailed insights require OpenAI integration"
-            ],
-            "recommendations": ["Review cohort manually for business opportunities"],
-            "risk_level": "Medium",
-            "priority_score": 3.0
-        }
+INSIGHTS_MODEL = "gpt-4o-mini"
+INSIGHTS_CACHE = JsonlCache(EXPORTS / 'insights_cache.jsonl', ttl=86400, enabled=LLM_CACHE)
+
+def insights_cache_key(cohort_name: str, cohort_summary: dict, brand_docs: dict) -> str:
+    """Content address for a cohort's insights; any brand doc edit changes the version part"""
+    brand_version = hashlib.sha256(json.dumps(dict(brand_docs), sort_keys=True).encode('utf-8')).hexdigest()
+    return hashlib.sha256(json.dumps({'n': cohort_name, 's': cohort_summary, 'v': brand_version},
+                                     sort_keys=True, default=str).encode('utf-8')).hexdigest()
+BATCH_POLL_SECONDS = int(os.getenv('BATCH_POLL_SECONDS', '30'))
+
+def build_insights_messages(cohort_name: str, cohort_summary: dict, brand_docs: dict) -> list:
+    """Chat messages asking the LLM for structured cohort insights"""
+    # Get brand context
+    archetype = cohort_summary.get('archetype', 'ValueSensitive')
+    brand_context = get_brand_context_for_archetype(archetype, brand_docs)
     
-    try:
-        client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_API_BASE)
-        
-        # Get brand context
-        archetype = cohort_summary.get('archetype', 'ValueSensitive')
-        brand_context = get_brand_context_for_archetype(archetype, brand_docs)
-        
-        # Build insights prompt
-        prompt = f"""Analyze this customer cohort for business insights:
+    # Build insights prompt
+    prompt = f"""Analyze this customer cohort for business insights:
 
 Cohort: {cohort_name}
 Size: {cohort_summary.get('size', 0)} customers
@@ -725,66 +1244,158 @@ Generate actionable business insights. Return ONLY valid JSON in this exact form
 }}
 
 Do not include any text before or after the JSON. Risk level must be Low, Medium, or High. Priority score must be 1.0-5.0."""
+    return [{'role': 'user', 'content': prompt}]
+
+def parse_insights_response(response_content: str) -> dict:
+    """Parse and sanitize the insights JSON returned by the LLM"""
+    # Debug: Print response content if it's problematic
+    if not response_content or not response_content.strip():
+        print(f"⚠️ Empty response from OpenAI for insights generation")
+        raise ValueError("Empty response from OpenAI")
+    
+    # Try to clean up the response content (sometimes has markdown formatting)
+    insights_data = json_loads(_strip_json_fence(response_content))
+    
+    # Validate and sanitize
+    insights_data['insights'] = insights_data.get('insights', [])[:3]  # Max 3 insights
+    insights_data['recommendations'] = insights_data.get('recommendations', [])[:3]  # Max 3 recommendations
+    insights_data['risk_level'] = insights_data.get('risk_level', 'Medium')
+    insights_data['priority_score'] = float(insights_data.get('priority_score', 3.0))
+    
+    return insights_data
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{'role': 'user', 'content': prompt}],
+def fallback_insights(cohort_name: str, cohort_summary: dict) -> dict:
+    """Insights derived from the cohort stats alone, used when the LLM call fails"""
+    archetype = cohort_summary.get('archetype', 'ValueSensitive')
+    size = cohort_summary.get('size', 0)
+    avg_value = cohort_summary.get('avg_monetary', 0)
+    avg_recency = cohort_summary.get('avg_recency', 0)
+    
+    risk_level = "High" if avg_recency > 30 else "Medium" if avg_recency > 14 else "Low"
+    priority = 4.0 if avg_value > 50 and size > 100 else 3.0
+    
+    return {
+        "insights": [
+            f"Cohort '{cohort_name}' contains {size} customers with {archetype} characteristics",
+            f"Average order value: ₹{avg_value:.2f}, typical for this segment",
+            f"Recency: {avg_recency:.1f} days - {'concerning' if avg_recency > 21 else 'normal'}"
+        ],
+        "recommendations": [
+            "Implement targeted retention campaign" if avg_recency > 21 else "Maintain engagement",
+            "Consider value-based offers" if archetype == "ValueSensitive" else "Focus on convenience"
+        ],
+        "risk_level": risk_level,
+        "priority_score": priority
+    }
+
+def generate_cohort_insights(cohort_name: str, cohort_summary: dict, brand_docs: dict) -> dict:
+    """Generate business insights for a cohort using LLM"""
+    return asyncio.run(agenerate_cohort_insights(cohort_name, cohort_summary, brand_docs))
+
+async def agenerate_cohort_insights(cohort_name: str, cohort_summary: dict, brand_docs: dict, client=None) -> dict:
+    """Async insights generation against the raw chat completions endpoint"""
+    
+    if not OPENAI_AVAILABLE:
+        return {
+            "insights": [
+                f"Cohort '{cohort_name}' has {cohort_summary.get('size', 0)} customers",
+                "Detailed insights require OpenAI integration"
+            ],
+            "recommendations": ["Review cohort manually for business opportunities"],
+            "risk_level": "Medium",
+            "priority_score": 3.0
+        }
+    
+    key = insights_cache_key(cohort_name, cohort_summary, brand_docs)
+    if (hit := INSIGHTS_CACHE.get(key)) is not None:
+        return hit
+    
+    try:
+        response = await LLM_QUEUE.submit(
+            build_insights_messages(cohort_name, cohort_summary, brand_docs),
+            model=INSIGHTS_MODEL,
             temperature=0.3,
-            max_tokens=400
+            max_tokens=400,
+            use_cache=False,  # INSIGHTS_CACHE (with its TTL) is the only cache layer here
+            client=client
         )
+        if response is None:
+            raise ValueError("OPENAI_API_KEY not set")
         
-        response_content = response.choices[0].message.content
-        
-        # Debug: Print response content if it's problematic
-        if not response_content or not response_content.strip():
-            print(f"⚠️ Empty response from OpenAI for insights generation")
-            raise ValueError("Empty response from OpenAI")
-        
-        # Try to clean up the response content (sometimes has markdown formatting)
-        if '```json' in response_content:
-            # Extract JSON from markdown code block
-            start = response_content.find('```json') + 7
-            end = response_content.find('```', start)
-            response_content = response_content[start:end].strip()
-        elif '```' in response_content:
-            # Extract from generic code block
-            start = response_content.find('```') + 3
-            end = response_content.find('```', start)
-            response_content = response_content[start:end].strip()
-        
-        insights_data = json.loads(response_content)
-        
-        # Validate and sanitize
-        insights_data['insights'] = insights_data.get('insights', [])[:3]  # Max 3 insights
-        insights_data['recommendations'] = insights_data.get('recommendations', [])[:3]  # Max 3 recommendations
-        insights_data['risk_level'] = insights_data.get('risk_level', 'Medium')
-        insights_data['priority_score'] = float(insights_data.get('priority_score', 3.0))
-        
+        insights_data = parse_insights_response(response['choices'][0]['message']['content'])
+        INSIGHTS_CACHE.set(key, insights_data)
         return insights_data
         
     except Exception as e:
         print(f"LLM insights generation failed: {e}")
-        # Fallback insights based on data
-        size = cohort_summary.get('size', 0)
-        avg_value = cohort_summary.get('avg_monetary', 0)
-        avg_recency = cohort_summary.get('avg_recency', 0)
-        
-        risk_level = "High" if avg_recency > 30 else "Medium" if avg_recency > 14 else "Low"
-        priority = 4.0 if avg_value > 50 and size > 100 else 3.0
-        
-        return {
-            "insights": [
-                f"Cohort '{cohort_name}' contains {size} customers with {archetype} characteristics",
-                f"Average order value: ₹{avg_value:.2f}, typical for this segment",
-                f"Recency: {avg_recency:.1f} days - {'concerning' if avg_recency > 21 else 'normal'}"
-            ],
-            "recommendations": [
-                "Implement targeted retention campaign" if avg_recency > 21 else "Maintain engagement",
-                "Consider value-based offers" if archetype == "ValueSensitive" else "Focus on convenience"
-            ],
-            "risk_level": risk_level,
-            "priority_score": priority
-        }
+        return fallback_insights(cohort_name, cohort_summary)
+
+def generate_all_cohort_insights(cohort_summaries: Dict[str, dict], brand_docs: dict) -> Dict[str, dict]:
+    """Generate insights for every cohort with concurrent live calls, keyed by cohort name"""
+    names = list(cohort_summaries)
+    results = asyncio.run(gather_llm(
+        lambda name, client: agenerate_cohort_insights(name, cohort_summaries[name], brand_docs, client=client), names
+    ))
+    return {name: fallback_insights(name, cohort_summaries[name]) if isinstance(res, Exception) else res
+            for name, res in zip(names, results)}
+
+def run_chat_batch(payloads: Dict[str, dict], label: str = 'chat') -> Dict[str, dict]:
+    """
+    Run chat completion payloads as one OpenAI Batch API job (keyed by custom_id).
+    Uploads the requests as in-memory JSONL, polls every BATCH_POLL_SECONDS until the
+    batch finishes and returns the response bodies of the successful requests.
+    Raises if the batch cannot be created or does not complete.
+    """
+    client = get_openai_client()
+    lines = [json.dumps({'custom_id': custom_id, 'method': 'POST', 'url': '/v1/chat/completions', 'body': payload})
+             for custom_id, payload in payloads.items()]
+    batch_file = client.files.create(file=(f'{label}_batch.jsonl', '\n'.join(lines).encode('utf-8')), purpose='batch')
+    batch = client.batches.create(input_file_id=batch_file.id, endpoint='/v1/chat/completions', completion_window='24h')
+    print(f"📦 Submitted {label} batch {batch.id} ({len(payloads)} requests)")
+    while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+        time.sleep(BATCH_POLL_SECONDS)
+        batch = client.batches.retrieve(batch.id)
+    if batch.status != 'completed' or not batch.output_file_id:
+        raise RuntimeError(f"batch {batch.id} ended with status {batch.status}")
+    bodies = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        record = json_loads(line)
+        response = record.get('response') or {}
+        if response.get('status_code') == 200:
+            bodies[record['custom_id']] = response['body']
+        else:
+            print(f"Batch request {record.get('custom_id')} failed: {record.get('error') or response.get('status_code')}")
+    return bodies
+
+def submit_insights_batch(cohort_summaries: Dict[str, dict], brand_docs: dict) -> Dict[str, dict]:
+    """
+    Generate insights for every uncached cohort through a single OpenAI Batch API job,
+    keyed by cohort name. Cohorts without a usable result get fallback insights;
+    if the batch itself cannot run, the live per-cohort path is used instead.
+    """
+    keys = {name: insights_cache_key(name, summary, brand_docs) for name, summary in cohort_summaries.items()}
+    results = {name: hit for name, key in keys.items() if (hit := INSIGHTS_CACHE.get(key)) is not None}
+    names = [name for name in cohort_summaries if name not in results]
+    if not names:
+        return results
+    try:
+        bodies = run_chat_batch({
+            name: _chat_payload(build_insights_messages(name, cohort_summaries[name], brand_docs),
+                                INSIGHTS_MODEL, 0.3, max_tokens=400)
+            for name in names
+        }, label='insights')
+    except Exception as e:
+        print(f"Insights batch failed, falling back to live calls: {e}")
+        return generate_all_cohort_insights(cohort_summaries, brand_docs)
+    for name, body in bodies.items():
+        try:
+            results[name] = parse_insights_response(body['choices'][0]['message']['content'])
+            INSIGHTS_CACHE.set(keys[name], results[name])
+        except Exception as e:
+            print(f"Batch insights for {name} unusable: {e}")
+    return {name: results.get(name) or fallback_insights(name, cohort_summaries[name]) for name in cohort_summaries}
 
 # Initialize system - no fallback mode allowed
 def initialize_system(skip_api_test=False):
@@ -807,30 +1418,21 @@ def initialize_system(skip_api_test=False):
 
 # --- Runner ---
 
-def run():
+def run(use_batch=False):
     # Initialize system first - no fallbacks allowed
     initialize_system()
     
-    df0 = load_data()
-    df0 = canonicalize_columns(df0)
-    df = compute_features(df0)
-    # Ensure required numeric columns exist to avoid pandas.query failures
-    for _c in ['CouponUsed','CashbackAmount','DaySinceLastOrder','OrderCount','Tenure','Engagement','MonetaryValue']:
-        if _c not in df.columns:
-            df[_c] = 0
-    df['Status'] = mark_status(df)
-    
-    # === Micro-Cohort Processing ===
+    # Features, status and micro-cohorts (served from the processed cache while fresh)
     print("\n=== Creating Micro-Cohorts ===")
-    df, clustering_pipeline, knn_model, preprocessor = create_micro_cohorts(df)
+    df, clustering_pipeline, knn_model, preprocessor = get_processed_data()
     
     # Add micro-cohort summaries to traditional cohorts
     micro_cohort_summaries = {}
     if 'CohortID' in df.columns:
-        for cohort_id in df['CohortID'].unique():
-            cohort_df = df[df['CohortID'] == cohort_id]
+        micro_stats = summarize_micro_cohorts(df)
+        for cohort_id, cohort_df in df.groupby('CohortID', sort=False, observed=True):
             if len(cohort_df) > 0:
-                summary = summarize_micro_cohort(cohort_df)
+                summary = micro_stats[cohort_id]
                 archetype_info = classify_archetype(summary)
                 summary['archetype'] = archetype_info.get('archetype', 'ValueSensitive')
                 summary['archetype_reason'] = archetype_info.get('why', 'Default classification')
@@ -841,100 +1443,131 @@ def run():
     
     # traditional cohorts
     cohort_cards = {}
+    thresholds = cohort_thresholds(df)
     for name,fn in COHORTS.items():
-        d = fn(df.copy())
+        d = fn(df, thresholds)  # filters return new row subsets; df itself is never mutated
         summary = cohort_summary(d)
         # Add archetype classification for traditional cohorts too
         archetype_info = classify_archetype(summary)
         summary['archetype'] = archetype_info.get('archetype', 'ValueSensitive')
         summary['archetype_reason'] = archetype_info.get('why', 'Default classification')
         
-        # Generate insights for this cohort
-        brand_docs = load_brand_documents()
-        insights_data = generate_cohort_insights(name, summary, brand_docs)
-        
         cohort_cards[name] = {
             'data': d.sort_values('ResurrectionScore', ascending=False) if len(d) else d,
             'summary': summary,
-            'insights': insights_data
+            'insights': None
         }
         print('\n===', name,'===')
-        print(json.dumps(cohort_cards[name]['summary'], indent=2))
+        print(json_dumps(cohort_cards[name]['summary'], indent=True))
+    
+    # Insights for all cohorts at once: one Batch API job, or concurrent live calls
+    cohort_summaries = {name: card['summary'] for name, card in cohort_cards.items()}
+    brand_docs = load_brand_documents()
+    if use_batch:
+        all_insights = submit_insights_batch(cohort_summaries, brand_docs)
+    else:
+        all_insights = generate_all_cohort_insights(cohort_summaries, brand_docs)
+    for name, card in cohort_cards.items():
+        card['insights'] = all_insights[name]
     
-    # exports 
-    for name,card in cohort_cards.items():
+    # exports (written in parallel; pyarrow's CSV writer releases the GIL)
+    def _export(item):
+        name, card = item
         fname = EXPORTS / (name.replace(' ','_') + '.csv')
         try:
-            card['data'].to_csv(fname, index=False)
-            print('Wrote', fname)
+            write_csv(card['data'], fname)
+            return f'Wrote {fname}'
         except Exception:
-            print('No data to write for', name)
+            return f'No data to write for {name}'
+    with ThreadPoolExecutor(max_workers=max(1, min(len(cohort_cards), os.cpu_count() or 1))) as pool:
+        for msg in pool.map(_export, cohort_cards.items()):
+            print(msg)
     # RAG corpus
     corpus = load_corpus()
     retriever = build_retriever(corpus)
     # For each cohort, generate messages
     outputs = {}
-    for name, card in cohort_cards.items():
-        summary = card['summary']
-        prompt = f"Cohort: {name} | Summary: {json.dumps(summary)}\nTop brand facts:\n"
-        top_docs = retrieve(retriever, json.dumps(summary), topk=2)
+    def _extract_content(res):
+        if not res:
+            return None
+        # Common OpenAI-like shapes
+        try:
+            if isinstance(res, dict) and 'choices' in res and len(res['choices'])>0:
+                choice = res['choices'][0]
+                if isinstance(choice.get('message'), dict) and 'content' in choice['message']:
+                    return choice['message']['content']
+                if 'text' in choice:
+                    return choice['text']
+            # legacy: sometimes the client returns the dict directly
+            if isinstance(res, str):
+                return res
+        except Exception:
+            return None
+        return None
+
+    def _validate_eval(obj):
+        """Ensure obj has _eval with required keys and normalize values."""
+        if not isinstance(obj, dict):
+            return False, 'not-a-dict'
+        ev = obj.get('_eval')
+        if not isinstance(ev, dict):
+            return False, 'no-_eval'
+        if 'overall' not in ev or 'urgency' not in ev or 'compliance_ok' not in ev:
+            return False, 'missing-keys'
+        # normalize
+        try:
+            ov = float(ev['overall'])
+            if not (0 <= ov <= 10):
+                return False, 'overall-range'
+        except Exception:
+            return False, 'overall-numeric'
+        if ev['urgency'] not in ['low','medium','high']:
+            # attempt to coerce
+            u = str(ev['urgency']).lower()
+            if 'high' in u:
+                ev['urgency'] = 'high'
+            elif 'low' in u:
+                ev['urgency'] = 'low'
+            else:
+                ev['urgency'] = 'medium'
+        if not isinstance(ev['compliance_ok'], bool):
+            ev['compliance_ok'] = bool(ev['compliance_ok'])
+        obj['_eval'] = ev
+        return True, 'ok'
+
+    # Build every cohort's prompt first, then send the chat requests concurrently
+    chat_requests = {}
+    summary_texts = [json.dumps(card['summary']) for card in cohort_cards.values()]
+    all_top_docs = retrieve_many(retriever, summary_texts, topk=2)
+    for name, summary_text, top_docs in zip(cohort_cards, summary_texts, all_top_docs):
+        prompt = f"Cohort: {name} | Summary: {summary_text}\nTop brand facts:\n"
         print("RAG sources:", [d.get("source") for d in top_docs])
         for d in top_docs:
             prompt += f"- {d['source']}: { (d['text'] or '')[:300].replace('\n',' ') }\n"
         # build chat messages
         system = {'role':'system','content':'You write short retention messages. Return JSON {"channel":"...","variants":[{"title":"","body":""}] }'}
         user = {'role':'user','content': prompt + '\nCreate 2 short variants.'}
-        def _extract_content(res):
-            if not res:
-                return None
-            # Common OpenAI-like shapes
-            try:
-                if isinstance(res, dict) and 'choices' in res and len(res['choices'])>0:
-                    choice = res['choices'][0]
-                    if isinstance(choice.get('message'), dict) and 'content' in choice['message']:
-                        return choice['message']['content']
-                    if 'text' in choice:
-                        return choice['text']
-                # legacy: sometimes the client returns the dict directly
-                if isinstance(res, str):
-                    return res
-            except Exception:
-                return None
-            return None
-
-        def _validate_eval(obj):
-            """Ensure obj has _eval with required keys and normalize values."""
-            if not isinstance(obj, dict):
-                return False, 'not-a-dict'
-            ev = obj.get('_eval')
-            if not isinstance(ev, dict):
-                return False, 'no-_eval'
-            if 'overall' not in ev or 'urgency' not in ev or 'compliance_ok' not in ev:
-                return False, 'missing-keys'
-            # normalize
-            try:
-                ov = float(ev['overall'])
-                if not (0 <= ov <= 10):
-                    return False, 'overall-range'
-            except Exception:
-                return False, 'overall-numeric'
-            if ev['urgency'] not in ['low','medium','high']:
-                # attempt to coerce
-                u = str(ev['urgency']).lower()
-                if 'high' in u:
-                    ev['urgency'] = 'high'
-                elif 'low' in u:
-                    ev['urgency'] = 'low'
-                else:
-                    ev['urgency'] = 'medium'
-            if not isinstance(ev['compliance_ok'], bool):
-                ev['compliance_ok'] = bool(ev['compliance_ok'])
-            obj['_eval'] = ev
-            return True, 'ok'
-
+        chat_requests[name] = [system, user]
+    chat_results = None
+    if use_batch:
+        try:
+            chat_results = run_chat_batch({name: _chat_payload(messages, 'gpt-4o-mini', 0.4)
+                                           for name, messages in chat_requests.items()}, label='messages')
+            chat_results = {name: chat_results.get(name) for name in chat_requests}
+        except Exception as e:
+            print(f"Message batch failed, falling back to live calls: {e}")
+            chat_results = None
+    if chat_results is None:
+        chat_results = dict(zip(chat_requests, asyncio.run(gather_llm(
+            lambda messages, client: LLM_QUEUE.submit(messages, use_cache=False, client=client), list(chat_requests.values())
+        ))))
+    
+    for name in cohort_cards:
         # Make live OpenAI API call only
         try:
-            res = call_chat([system, user])
+            res = chat_results[name]
+            if isinstance(res, Exception):
+                raise res
             content = _extract_content(res)
 
             if not content:
@@ -943,7 +1576,7 @@ def run():
             parsed = None
             if content:
                 try:
-                    parsed = json.loads(content)
+                    parsed = json_loads(content)
                 except Exception:
                     # sometimes content may be raw text; wrap into simple structure and set minimal _eval
                     parsed = {'channel': 'email', 'variants': [{'title': 'Demo', 'body': content[:200]}], '_eval': {'overall':5,'urgency':'medium','compliance_ok':True}}
@@ -970,54 +1603,97 @@ def run():
             raise RuntimeError(f'❌ Failed to generate messages for cohort {name}: {str(e)}')
         outputs[name] = data
         print('\nSample output for',name,':')
-        print(json.dumps(data, indent=2)[:2000])
-    # write manifest
-    with open(EXPORTS / 'manifest.json','w') as f:
-        json.dump({'cohorts': {k:v['summary'] for k,v in cohort_cards.items()}}, f, indent=2)
-    # persist generated messages
+        print(json_dumps(data, indent=True)[:2000])
+    # Simple ROI waterfall estimate for each cohort and overall
+    # assumptions: 2% conversion on average value recovered per contacted customer; cost $0.25 per contact
+    df_roi = pd.DataFrame.from_records(
+        [(name, card['summary'].get('size',0), card['summary'].get('avg_value',0)) for name, card in cohort_cards.items()],
+        columns=['cohort', 'size', 'avg_value']
+    )
+    size = df_roi['size'].to_numpy()
+    est_recovered = size * df_roi['avg_value'].to_numpy(dtype=float) * 0.02
+    cost = size * 0.25
+    net = est_recovered - cost
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roi_ratio = np.where(cost != 0, net / cost, np.nan)
+    df_roi = df_roi.drop(columns='avg_value').assign(est_recovered=est_recovered, cost=cost, net=net, roi_ratio=roi_ratio)
+    # zero-cost cohorts have no ratio: null in JSON, empty in CSV
+    df_roi['roi_ratio'] = df_roi['roi_ratio'].astype(object).where(df_roi['roi_ratio'].notna(), None)
+
+    write_json(EXPORTS / 'manifest.json', {'cohorts': {k:v['summary'] for k,v in cohort_cards.items()}})
     try:
-        with open(EXPORTS / 'last_run_messages.json','w') as f:
-            json.dump(outputs, f, indent=2)
+        write_json(EXPORTS / 'last_run_messages.json', outputs)
         print('Wrote', EXPORTS / 'last_run_messages.json')
     except Exception as e:
         print('Failed to write last_run_messages.json:', e)
-
-    # Simple ROI waterfall estimate for each cohort and overall
-    roi = {}
-    rows = []
-    for name, card in cohort_cards.items():
-        s = card['summary']
-        size = s.get('size',0)
-        avg_value = s.get('avg_value',0)
-        # assumptions: 2% conversion on average value recovered per contacted customer; cost $0.25 per contact
-        est_recovered = size * avg_value * 0.02
-        cost = size * 0.25
-        net = est_recovered - cost
-        roi[name] = {'size': size, 'est_recovered': est_recovered, 'cost': cost, 'net': net, 'roi_ratio': (net / cost) if cost else None}
-        rows.append({'cohort': name, 'size': size, 'est_recovered': est_recovered, 'cost': cost, 'net': net, 'roi_ratio': (net / cost) if cost else None})
     try:
-        with open(EXPORTS / 'last_run_roi.json','w') as f:
-            json.dump(roi, f, indent=2)
-        pd.DataFrame(rows).to_csv(EXPORTS / 'last_run_roi.csv', index=False)
+        write_json(EXPORTS / 'last_run_roi.json', df_roi.set_index('cohort').to_dict('index'))
+        df_roi.to_csv(EXPORTS / 'last_run_roi.csv', index=False)
         print('Wrote', EXPORTS / 'last_run_roi.json', 'and', EXPORTS / 'last_run_roi.csv')
     except Exception as e:
         print('Failed to write ROI outputs:', e)
     print('\nDone. Exports in', EXPORTS)
 
 # === Integration Functions for Streamlit App ===
+REQUIRED_NUMERIC_COLS = ['CouponUsed','CashbackAmount','DaySinceLastOrder','OrderCount','Tenure','Engagement','MonetaryValue']
+PROCESSED_CACHE = os.getenv('PROCESSED_CACHE', '1') == '1'
+PROCESSED_PATH = EXPORTS / '_processed.parquet'
+PROCESSED_MODELS_PATH = EXPORTS / '_processed_models.joblib'
+
+def _load_processed_cache():
+    """Return the cached (df, clustering_pipeline, knn_model, preprocessor) if newer than the dataset and this module"""
+    if not (PROCESSED_CACHE and PYARROW_AVAILABLE and SKLEARN_AVAILABLE):
+        return None
+    dataset_path = Path(os.getenv('DATASET_PATH', 'dataset.csv'))
+    try:
+        cached_at = min(PROCESSED_PATH.stat().st_mtime, PROCESSED_MODELS_PATH.stat().st_mtime)
+        if cached_at < max(dataset_path.stat().st_mtime, Path(__file__).stat().st_mtime):
+            return None
+        bundle = joblib.load(PROCESSED_MODELS_PATH)
+        if bundle.get('dataset') != str(dataset_path.resolve()):
+            return None
+        df = pd.read_parquet(PROCESSED_PATH)
+    except Exception:
+        return None
+    print(f'📦 Loaded processed data from {PROCESSED_PATH}')
+    return df, bundle['clustering_pipeline'], bundle['knn_model'], bundle['preprocessor']
+
+def _save_processed_cache(df, clustering_pipeline, knn_model, preprocessor):
+    if not (PROCESSED_CACHE and PYARROW_AVAILABLE and SKLEARN_AVAILABLE):
+        return
+    dataset_path = Path(os.getenv('DATASET_PATH', 'dataset.csv'))
+    # Write both files under temporary names and only swap them in once both succeed,
+    # so a failed dump never leaves a Parquet file without its models bundle
+    tmp_df, tmp_models = PROCESSED_PATH.with_suffix('.parquet.tmp'), PROCESSED_MODELS_PATH.with_suffix('.joblib.tmp')
+    try:
+        df.to_parquet(tmp_df)
+        joblib.dump({'dataset': str(dataset_path.resolve()), 'clustering_pipeline': clustering_pipeline,
+                     'knn_model': knn_model, 'preprocessor': preprocessor}, tmp_models)
+        PROCESSED_MODELS_PATH.unlink(missing_ok=True)  # a lone Parquet file is a cache miss
+        os.replace(tmp_df, PROCESSED_PATH)
+        os.replace(tmp_models, PROCESSED_MODELS_PATH)
+    except Exception as e:
+        tmp_df.unlink(missing_ok=True)
+        tmp_models.unlink(missing_ok=True)
+        print(f"⚠️ Could not cache processed data: {e}")
+
 def get_processed_data():
-    """Get processed data for Streamlit app"""
+    """Get processed data for Streamlit app (reuses the cached Parquet/joblib copy while fresh)"""
+    if (cached := _load_processed_cache()) is not None:
+        return cached
     df0 = load_data()
     df0 = canonicalize_columns(df0)
     df = compute_features(df0)
-    # Ensure required numeric columns exist
-    for _c in ['CouponUsed','CashbackAmount','DaySinceLastOrder','OrderCount','Tenure','Engagement','MonetaryValue']:
-        if _c not in df.columns:
-            df[_c] = 0
+    # Ensure required numeric columns exist (added together as one block)
+    missing = [c for c in REQUIRED_NUMERIC_COLS if c not in df.columns]
+    if missing:
+        df[missing] = 0
+    df = downcast_numeric(df)
     df['Status'] = mark_status(df)
     
     # Add micro-cohorts
     df, clustering_pipeline, knn_model, preprocessor = create_micro_cohorts(df)
+    _save_processed_cache(df, clustering_pipeline, knn_model, preprocessor)
     
     return df, clustering_pipeline, knn_model, preprocessor
 
@@ -1029,29 +1705,31 @@ def get_cohort_data():
     cohort_cards = {}
     brand_docs = load_brand_documents()  # Load once for all cohorts
     
+    thresholds = cohort_thresholds(df)
     for name,fn in COHORTS.items():
-        d = fn(df.copy())
+        d = fn(df, thresholds)
         summary = cohort_summary(d)
         archetype_info = classify_archetype(summary)
         summary['archetype'] = archetype_info.get('archetype', 'ValueSensitive')
         summary['archetype_reason'] = archetype_info.get('why', 'Default classification')
         
-        # Generate insights for this cohort
-        insights_data = generate_cohort_insights(name, summary, brand_docs)
-        
         cohort_cards[name] = {
             'data': d.sort_values('ResurrectionScore', ascending=False) if len(d) else d,
-            'summary': summary,
-            'insights': insights_data
+            'summary': summary
         }
     
+    # Generate insights for all cohorts concurrently
+    all_insights = generate_all_cohort_insights({name: card['summary'] for name, card in cohort_cards.items()}, brand_docs)
+    for name, card in cohort_cards.items():
+        card['insights'] = all_insights[name]
+    
     # Add micro-cohort summaries
     micro_cohort_summaries = {}
     if 'CohortID' in df.columns:
-        for cohort_id in df['CohortID'].unique():
-            cohort_df = df[df['CohortID'] == cohort_id]
+        micro_stats = summarize_micro_cohorts(df)
+        for cohort_id, cohort_df in df.groupby('CohortID', sort=False, observed=True):
             if len(cohort_df) > 0:
-                summary = summarize_micro_cohort(cohort_df)
+                summary = micro_stats[cohort_id]
                 archetype_info = classify_archetype(summary)
                 summary['archetype'] = archetype_info.get('archetype', 'ValueSensitive')
                 summary['archetype_reason'] = archetype_info.get('why', 'Default classification')
@@ -1064,89 +1742,95 @@ def get_cohort_data():
 
 def generate_message_with_eval(prompt, cohort_summary):
     """Generate messages with LLM-as-Judge evaluation"""
+    return asyncio.run(agenerate_message_with_eval(prompt, cohort_summary))
+
+_FENCE_RE = re.compile(r'```(?:json)?\s*(.*?)(?:```|$)', re.DOTALL)
+
+def _strip_json_fence(content):
+    """Return the body of the first ```json / ``` fenced block (closing fence optional), else the stripped content"""
+    m = _FENCE_RE.search(content)
+    return m.group(1).strip() if m else content.strip()
+
+async def ajudge_variant(variant, cohort_summary, client=None):
+    """Score one message variant with the LLM judge; brand safety overrides the judge's safety score"""
+    message_text = f"{variant.get('title', '')} {variant.get('body', '')}"
+    
+    # Safety check
+    safety_score = 5 if brand_safety(message_text) else 0
+    
+    # LLM Judge evaluation
+    judge_prompt = f"""Rate this retention message (1-5 scale):
+Message: {message_text}
+Cohort: {json.dumps(cohort_summary)}
+
+Evaluate: relevance, clarity, on_brand, persuasion, safety. Return JSON: {{"relevance":N,"clarity":N,"on_brand":N,"persuasion":N,"safety":N,"overall":N.N}}"""
+    
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_API_BASE)
+        judge_response = await LLM_QUEUE.submit(
+            [{'role': 'user', 'content': judge_prompt}],
+            model="gpt-4o-mini",
+            temperature=0.1,
+            max_tokens=100,
+            use_cache=True,
+            client=client
+        )
+        if judge_response is None:
+            raise ValueError("OPENAI_API_KEY not set")
         
+        judge_content = judge_response['choices'][0]['message']['content']
+        
+        # Clean judge response
+        if not judge_content or not judge_content.strip():
+            raise ValueError("Empty judge response")
+        
+        scores = json_loads(_strip_json_fence(judge_content))
+        scores['safety'] = safety_score  # Override with brand safety
+        return scores
+        
+    except Exception as e:
+        print(f"Judge evaluation failed: {e}")
+        return {
+            "relevance": 3, "clarity": 3, "on_brand": 4 if brand_safety(message_text) else 2,
+            "persuasion": 3, "safety": safety_score, "overall": 3.0
+        }
+
+async def agenerate_message_with_eval(prompt, cohort_summary, client=None):
+    """Async generation; the judge calls for all variants run concurrently on one client"""
+    if client is None:
+        async with httpx.AsyncClient(limits=LLM_HTTP_LIMITS, timeout=20) as c:
+            return await agenerate_message_with_eval(prompt, cohort_summary, client=c)
+    try:
         # Message generation
         system_msg = {
             'role': 'system',
             'content': 'You write retention messages for e-commerce. Return JSON: {"channel":"email/sms","variants":[{"title":"","body":""}]}'
         }
         
-        response = client.chat.completions.create(
+        response = await LLM_QUEUE.submit(
+            [system_msg, {'role': 'user', 'content': prompt}],
             model="gpt-4o-mini",
-            messages=[system_msg, {'role': 'user', 'content': prompt}],
             temperature=0.7,
-            max_tokens=300
+            max_tokens=300,
+            use_cache=False,
+            client=client
         )
+        if response is None:
+            raise ValueError("OPENAI_API_KEY not set")
         
-        response_content = response.choices[0].message.content
+        response_content = response['choices'][0]['message']['content']
         
         # Debug and clean response
         if not response_content or not response_content.strip():
             print(f"⚠️ Empty response from OpenAI for message generation")
             raise ValueError("Empty response from OpenAI")
         
-        # Clean markdown formatting if present
-        if '```json' in response_content:
-            start = response_content.find('```json') + 7
-            end = response_content.find('```', start)
-            response_content = response_content[start:end].strip()
-        elif '```' in response_content:
-            start = response_content.find('```') + 3
-            end = response_content.find('```', start)
-            response_content = response_content[start:end].strip()
-        
-        message_data = json.loads(response_content)
+        message_data = json_loads(_strip_json_fence(response_content))
         
         # LLM-as-Judge evaluation
-        for variant in message_data.get('variants', []):
-            message_text = f"{variant.get('title', '')} {variant.get('body', '')}"
-            
-            # Safety check
-            safety_score = 5 if brand_safety(message_text) else 0
-            
-            # LLM Judge evaluation
-            judge_prompt = f"""Rate this retention message (1-5 scale):
-Message: {message_text}
-Cohort: {json.dumps(cohort_summary)}
-
-Evaluate: relevance, clarity, on_brand, persuasion, safety. Return JSON: {{"relevance":N,"clarity":N,"on_brand":N,"persuasion":N,"safety":N,"overall":N.N}}"""
-            
-            try:
-                judge_response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{'role': 'user', 'content': judge_prompt}],
-                    temperature=0.1,
-                    max_tokens=100
-                )
-                
-                judge_content = judge_response.choices[0].message.content
-                
-                # Clean judge response
-                if not judge_content or not judge_content.strip():
-                    raise ValueError("Empty judge response")
-                
-                # Clean markdown formatting if present
-                if '```json' in judge_content:
-                    start = judge_content.find('```json') + 7
-                    end = judge_content.find('```', start)
-                    judge_content = judge_content[start:end].strip()
-                elif '```' in judge_content:
-                    start = judge_content.find('```') + 3
-                    end = judge_content.find('```', start)
-                    judge_content = judge_content[start:end].strip()
-                
-                scores = json.loads(judge_content)
-                scores['safety'] = safety_score  # Override with brand safety
-                variant['evaluation'] = scores
-                
-            except Exception as e:
-                print(f"Judge evaluation failed: {e}")
-                variant['evaluation'] = {
-                    "relevance": 3, "clarity": 3, "on_brand": 4 if brand_safety(message_text) else 2,
-                    "persuasion": 3, "safety": safety_score, "overall": 3.0
-                }
+        variants = message_data.get('variants', [])
+        evaluations = await asyncio.gather(*(ajudge_variant(v, cohort_summary, client=client) for v in variants))
+        for variant, evaluation in zip(variants, evaluations):
+            variant['evaluation'] = evaluation
         
         return message_data
         
@@ -1198,5 +1882,11 @@ Generate 2 variants."""
             }]
         }
 
+def main(argv=None):
+    """CLI entry point: `python run_churn_radar.py [--batch]`"""
+    argv = sys.argv[1:] if argv is None else argv
+    run(use_batch='--batch' in argv)
+    return 0
+
 if __name__=='__main__':
-    run()
+    sys.exit(main())
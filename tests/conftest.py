@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _warm_numba():
+    # compile (or load from __pycache__) the Numba scoring kernel once per session;
+    # set NUMBA_DISABLE_JIT=1 to run the kernel as plain Python instead
+    import run_churn_radar
+    if run_churn_radar.NUMBA_AVAILABLE:
+        run_churn_radar.compute_features(pd.DataFrame({
+            'CustomerID': ['W1', 'W2', 'W3'],
+            'OrderCount': [1, 2, 3],
+            'DaySinceLastOrder': [1, 5, 9],
+            'SatisfactionScore': [3, 4, 5],
+            'Complain': [0, 1, 0],
+        }))
+    yield
@@ -3,8 +3,62 @@ import json
 import subprocess
 from pathlib import Path
 
+import pytest
 
-def test_runner_creates_exports(tmp_path):
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+
+def _check_exports():
+    exports = Path('exports')
+    assert exports.exists()
+    manifest = exports / 'manifest.json'
+    assert manifest.exists(), 'manifest.json missing'
+    data = json_loads(manifest.read_bytes())
+    assert 'cohorts' in data and isinstance(data['cohorts'], dict)
+
+    # ensure at least one cohort CSV exists; the first match is enough
+    assert next(exports.glob('*.csv'), None) is not None, 'No CSV exports found'
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _offline_completion(*args, **kwargs):
+    # canned chat completion; the runner's parsers fall back to their default payloads
+    return {'choices': [{'message': {'role': 'assistant', 'content': '{}'}}]}
+
+
+def test_runner_creates_exports(monkeypatch, tmp_path):
+    # Call the runner in-process and offline: no API key, no connection check,
+    # and every LLM request answered by a canned completion
+    import run_churn_radar
+
+    async def _offline_acall_chat(*args, **kwargs):
+        return _offline_completion()
+
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.setattr(run_churn_radar, 'OPENAI_API_KEY', '')
+    monkeypatch.setenv('LIVE_ONLY', '0')
+    monkeypatch.setattr(run_churn_radar, 'initialize_system', lambda *args, **kwargs: None)
+    monkeypatch.setattr(run_churn_radar, 'acall_chat', _offline_acall_chat)
+    monkeypatch.setattr(run_churn_radar, '_post_chat', _offline_completion)
+
+    # write into tmp_path; the runner resolves brand_kit/ and exports/ from the working directory
+    (tmp_path / 'brand_kit').symlink_to(REPO_ROOT / 'brand_kit')
+    (tmp_path / 'exports').mkdir()
+    monkeypatch.setenv('DATASET_PATH', str(REPO_ROOT / 'dataset.csv'))
+    monkeypatch.chdir(tmp_path)
+
+    # runner should exit normally
+    assert run_churn_radar.main([]) == 0
+    _check_exports()
+
+
+@pytest.mark.skipif(os.getenv('CHURN_E2E') != '1', reason='end-to-end smoke run; set CHURN_E2E=1')
+def test_runner_subprocess_creates_exports():
     # Run the runner in a subprocess to avoid polluting test process state
     env = os.environ.copy()
     # force demo mode (no live API key)
@@ -14,15 +68,4 @@ def test_runner_creates_exports(tmp_path):
     p = subprocess.run(['python3', 'run_churn_radar.py'], env=env, capture_output=True, text=True)
     # runner should exit normally (we allow fallback/demo)
     assert p.returncode == 0 or p.returncode is None
-
-    exports = Path('exports')
-    assert exports.exists()
-    manifest = exports / 'manifest.json'
-    assert manifest.exists(), 'manifest.json missing'
-    with open(manifest) as f:
-        data = json.load(f)
-    assert 'cohorts' in data and isinstance(data['cohorts'], dict)
-
-    # ensure at least one cohort CSV exists
-    csvs = list(exports.glob('*.csv'))
-    assert len(csvs) >= 1, 'No CSV exports found'
+    _check_exports()
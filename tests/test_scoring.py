@@ -1,22 +1,16 @@
+import pickle
+
 import numpy as np
 import pandas as pd
-try:
-    from run_churn_radar import compute_features
-except Exception:
-    # fallback to import by path when PYTHONPATH isn't set in test runner
-    import importlib.util
-    import sys
-    from pathlib import Path
-    spec = importlib.util.spec_from_file_location('run_churn_radar', str(Path(__file__).resolve().parents[1] / 'run_churn_radar.py'))
-    module = importlib.util.module_from_spec(spec)
-    sys.modules['run_churn_radar'] = module
-    spec.loader.exec_module(module)
-    compute_features = module.compute_features
+import pytest
+
+# the repo root is put on sys.path by tests/conftest.py
+from run_churn_radar import FAISS_AVAILABLE, FaissKNN, compute_features
 
 
 def make_sample():
-    return pd.DataFrame({
-        'CustomerID': ['C1','C2','C3'],
+    # float64 columns match what compute_features reads, so to_numpy() needs no cast
+    numeric = {
         'OrderCount': [0, 5, 20],
         'CashbackAmount': [0, 50, 300],
         'CouponUsed': [0,1,2],
@@ -27,7 +21,9 @@ def make_sample():
         'Complain': [0,0,1],
         'Tenure': [1,12,36],
         'DaySinceLastOrder': [1,20,90],
-    })
+    }
+    return pd.DataFrame({'CustomerID': np.array(['C1','C2','C3'], dtype=object)}
+                        | {col: np.asarray(vals, dtype=np.float64) for col, vals in numeric.items()})
 
 
 def test_compute_features_ranges():
@@ -39,3 +35,24 @@ def test_compute_features_ranges():
     assert out['churn_risk'].min() >= 0 and out['churn_risk'].max() <= 10
     # value score between 0 and 10
     assert out['value_score'].min() >= 0 and out['value_score'].max() <= 10
+
+
+@pytest.mark.skipif(not FAISS_AVAILABLE, reason='faiss not installed')
+def test_faiss_ivf_returns_full_k():
+    # a small far-away cluster leaves the single probed IVF list short of k vectors
+    rng = np.random.default_rng(0)
+    X = np.vstack([rng.normal(0, 1, (300, 4)), rng.normal(50, 1, (3, 4))])
+    knn = FaissKNN(n_neighbors=15, ivf_threshold=100, nprobe=1).fit(X)
+    dists, idxs = knn.kneighbors(X[-1:])
+    assert idxs.shape == (1, 15)
+    assert (idxs >= 0).all() and np.isfinite(dists).all()
+    assert set(idxs[0][:3]) == {300, 301, 302}
+
+
+@pytest.mark.skipif(not FAISS_AVAILABLE, reason='faiss not installed')
+def test_faiss_knn_pickles():
+    # the processed-data cache joblib-dumps the fitted knn model
+    X = np.random.default_rng(1).normal(size=(200, 3))
+    knn = FaissKNN(n_neighbors=5, ivf_threshold=100).fit(X)
+    restored = pickle.loads(pickle.dumps(knn))
+    np.testing.assert_array_equal(restored.kneighbors(X[:4])[1], knn.kneighbors(X[:4])[1])
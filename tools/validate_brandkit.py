@@ -5,7 +5,9 @@ Validates the presence and basic structure of brand kit documents.
 """
 import os
 import sys
+import mmap
 from pathlib import Path
+from typing import Final, FrozenSet, Tuple
 
 REQUIRED_FILES = [
     "brand_overview.md",
@@ -14,6 +16,22 @@ REQUIRED_FILES = [
     "offer_policy.md"
 ]
 
+def _needles(*keywords: str) -> FrozenSet[bytes]:
+    """lower, Title and UPPER case byte variants of each keyword"""
+    return frozenset(variant.encode() for kw in keywords for variant in (kw.lower(), kw.title(), kw.upper()))
+
+# (file, needles) content checks, built once at import
+CONTENT_KEYWORDS: Final[Tuple[Tuple[str, FrozenSet[bytes]], ...]] = (
+    ("brand_overview.md", _needles("company", "brand", "overview")),
+    ("compliance.md", _needles("compliance", "legal", "policy")),
+)
+
+def _contains_any(path: Path, needles: FrozenSet[bytes]) -> bool:
+    """Search the mapped file bytes for any needle without decoding it"""
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return any(mm.find(needle) != -1 for needle in needles)
+
 def validate_brand_kit(brand_kit_path: str = "brand_kit") -> bool:
     """
     Validate brand kit directory and files.
@@ -32,11 +50,14 @@ def validate_brand_kit(brand_kit_path: str = "brand_kit") -> bool:
     missing_files = []
     empty_files = []
     
+    # One directory listing answers presence; only the present files are stat()ed
+    with os.scandir(kit_path) as it:
+        entries = {entry.name: entry for entry in it}
     for filename in REQUIRED_FILES:
-        file_path = kit_path / filename
-        if not file_path.exists():
+        entry = entries.get(filename)
+        if entry is None:
             missing_files.append(filename)
-        elif file_path.stat().st_size == 0:
+        elif entry.stat().st_size == 0:
             empty_files.append(filename)
     
     if missing_files:
@@ -48,17 +69,9 @@ def validate_brand_kit(brand_kit_path: str = "brand_kit") -> bool:
         return False
     
     # Check basic content structure
-    overview_path = kit_path / "brand_overview.md"
-    with open(overview_path, 'r') as f:
-        content = f.read().lower()
-        if not any(keyword in content for keyword in ["company", "brand", "overview"]):
-            print("⚠️  brand_overview.md may not contain expected content")
-    
-    compliance_path = kit_path / "compliance.md"
-    with open(compliance_path, 'r') as f:
-        content = f.read().lower()
-        if not any(keyword in content for keyword in ["compliance", "legal", "policy"]):
-            print("⚠️  compliance.md may not contain expected content")
+    for filename, needles in CONTENT_KEYWORDS:
+        if not _contains_any(kit_path / filename, needles):
+            print(f"⚠️  {filename} may not contain expected content")
     
     print("✅ Brand kit validation passed")
     print(f"📁 Location: {kit_path.absolute()}")